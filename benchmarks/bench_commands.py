@@ -0,0 +1,76 @@
+"""
+Per-command latency and message count of the pos/poco lookup commands on a synthetic fleet, rendered and cached.
+Usage: python benchmarks/bench_commands.py [towers]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.fleet import Fleet  # noqa: E402
+from models.eveentities import Corp  # noqa: E402
+from models.jumpgraph import JumpGraph  # noqa: E402
+from models.pagecache import PageCache  # noqa: E402
+from models.pocos import Poco  # noqa: E402
+from models.seatdata import SeatData  # noqa: E402
+from models.starbases import Starbase  # noqa: E402
+from seat import Seat  # noqa: E402
+
+
+def load(fleet):
+    seat_data = SeatData('token', 'http://localhost')
+    for corp_json in fleet.corps:
+        corp = Corp(corp_json)
+        for starbase_json in fleet.starbases[corp.corporationID]:
+            seat_data.add_starbase(Starbase(starbase_json, corp))
+        for poco_json in fleet.pocos[corp.corporationID]:
+            seat_data.add_poco(Poco(poco_json, corp))
+    return seat_data
+
+
+def time_commands(plugin, system, number=50):
+    """
+    :param plugin: Seat plugin with seat_data loaded
+    :param system: str solar system to search for
+    :param number: int Number of runs per command
+    :return: dict command -> (milliseconds per rendered run, milliseconds per cached run, messages)
+    """
+    commands = [
+        ('pos find', plugin.pos_find, system),
+        ('poco find', plugin.poco_find, system),
+        ('poco window', plugin.poco_window, '18 22 system'),
+        ('pos near', plugin.pos_near, system + ' 5'),
+        ('poco near', plugin.poco_near, system + ' 5'),
+        ('pos offline', plugin.pos_offline, ''),
+        ('pos oos', plugin.pos_oos, ''),
+        ('pos oof', plugin.pos_oof, '12'),
+        ('pos fuelplan', plugin.pos_fuelplan, '7'),
+    ]
+    results = {}
+    for name, command, args in commands:
+        timings = []
+        # a ttl of 0 renders on every run
+        for pages in (PageCache(ttl=0), PageCache()):
+            plugin.pages = pages
+            seconds = timeit.timeit(lambda: list(command(None, args)), number=number)
+            timings.append(seconds / number * 1000)
+        messages = command(None, args)
+        results[name] = (timings[0], timings[1], 1 if isinstance(messages, str) else len(list(messages)))
+    return results
+
+
+def main(towers=10000):
+    fleet = Fleet(corps=100, towers=towers, pocos=towers, systems=2000)
+    plugin = Seat.__new__(Seat)
+    plugin.seat_data = load(fleet)
+    plugin.message_length = 1900
+    plugin.jumps = JumpGraph(fleet.jumps())
+    print('%d towers, %d pocos' % (len(plugin.seat_data.starbases), len(plugin.seat_data.pocos)))
+    print('%-12s %12s %12s %9s' % ('command', 'rendered', 'cached', 'messages'))
+    for name, (rendered, cached, messages) in time_commands(plugin, fleet.systems[0]).items():
+        print('%-12s %9.3f ms %9.3f ms %9d' % (name, rendered, cached, messages))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,64 @@
+"""
+Peak memory of fetching and storing the starbases and pocos of a single large corporation.
+Compares decoding whole responses with the streamed ingestion, each run in a fresh process.
+Usage: python benchmarks/bench_ingest.py [--towers 20000] [--pocos 20000]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks import fake_seat  # noqa: E402
+from benchmarks.bench_seat import peak_rss  # noqa: E402
+from models.seatdata import SeatData  # noqa: E402
+
+CORP = {'corporationID': 98000000, 'ticker': 'C000'}
+
+
+def ingest(mode, url, results):
+    seat_data = SeatData('token', url)
+    corp = seat_data.intern_corp(CORP)
+    corpid = corp.corporationID
+    session = seat_data.sources['']
+    rss_start = peak_rss()
+    start = time.perf_counter()
+    if mode == 'decoded':
+        # the whole response as python objects, like r.json() did
+        seat_data._ingest_starbases(corp, session.get('/corporation/starbases/%d' % corpid))
+        seat_data._ingest_pocos(corp, session.get('/corporation/pocos/%d' % corpid))
+    else:
+        seat_data._ingest_starbases(corp, seat_data._get_seat_all_starbases(corp))
+        seat_data._ingest_pocos(corp, seat_data._get_seat_all_pocos(corp))
+    results.put({'mode': mode, 'seconds': time.perf_counter() - start, 'starbases': len(seat_data.starbases),
+                 'pocos': len(seat_data.pocos), 'peak_rss_growth_bytes': peak_rss() - rss_start,
+                 'payload_bytes': sum(stats.bytes for stats in seat_data.stats.endpoints.values())})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--towers', type=int, default=20000)
+    parser.add_argument('--pocos', type=int, default=20000)
+    args = parser.parse_args()
+
+    process, url = fake_seat.start_process(corps=1, towers=args.towers, pocos=args.pocos, full=True)
+    # spawn, a forked child would start with the memory of this process
+    context = multiprocessing.get_context('spawn')
+    try:
+        report = []
+        for mode in ('decoded', 'streamed'):
+            results = context.Queue()
+            child = context.Process(target=ingest, args=(mode, url, results))
+            child.start()
+            report.append(results.get(timeout=600))
+            child.join()
+    finally:
+        process.terminate()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
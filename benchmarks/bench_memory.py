@@ -0,0 +1,65 @@
+"""
+Memory used by the stored starbases and pocos of a synthetic fleet.
+Compares the slotted model classes with the same classes without __slots__, as they were before, each run in a fresh
+process.
+Usage: python benchmarks/bench_memory.py [towers]
+"""
+import importlib.util
+import multiprocessing
+import os
+import re
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.fleet import Fleet  # noqa: E402
+
+# the models SeatData stores, the modules are imported in the measuring process only so they can be swapped first
+MODEL_MODULES = ('models.eveentities', 'models.starbases', 'models.pocos')
+_SLOTS = re.compile(r'^ *__slots__ = \(.*?\)\n', re.MULTILINE | re.DOTALL)
+
+
+def unslot_models():
+    """Loads the model modules from their source with the __slots__ declarations removed"""
+    for name in MODEL_MODULES:
+        spec = importlib.util.find_spec(name)
+        source = _SLOTS.sub('', spec.loader.get_source(name))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        exec(compile(source, spec.origin, 'exec'), module.__dict__)
+
+
+def measure(mode, towers, results):
+    if mode == 'unslotted':
+        unslot_models()
+    from models.seatdata import SeatData
+    fleet = Fleet(corps=200, towers=towers, pocos=towers, systems=2000)
+    seat_data = SeatData('token', 'http://localhost')
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for corp_json in fleet.corps:
+        corpid = corp_json['corporationID']
+        # one fetch per corp like fetch_starbases/fetch_pocos do
+        seat_data._ingest_starbases(seat_data.intern_corp(corp_json), fleet.starbases[corpid])
+        seat_data._ingest_pocos(seat_data.intern_corp(corp_json), fleet.pocos[corpid])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    results.put('%-9s %d towers, %d pocos: %.1f MiB, %d bytes per tower+poco' % (
+        mode, len(seat_data.starbases), len(seat_data.pocos), used / 2 ** 20, used / len(seat_data.starbases)))
+
+
+def main(towers=20000):
+    # spawn, a forked child would share the model modules already imported here
+    context = multiprocessing.get_context('spawn')
+    for mode in ('unslotted', 'slotted'):
+        results = context.Queue()
+        child = context.Process(target=measure, args=(mode, towers, results))
+        child.start()
+        print(results.get(timeout=600))
+        child.join()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,116 @@
+"""
+End-to-end benchmark of SeatData and the Seat plugin against a local fake SeAT.
+Measures refresh time, module check time, command latency and peak memory and writes them as JSON.
+Usage: python benchmarks/bench_seat.py [--towers 1000] [--latency 0.05] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks import fake_seat  # noqa: E402
+from benchmarks.bench_commands import time_commands  # noqa: E402
+from benchmarks.fleet import Fleet  # noqa: E402
+from models.jumpgraph import JumpGraph  # noqa: E402
+from models.outbox import Outbox  # noqa: E402
+from models.pagecache import PageCache  # noqa: E402
+from models.seatdata import SeatData  # noqa: E402
+from seat import Seat  # noqa: E402
+
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def peak_rss():
+    """:return: int peak resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def make_plugin(seat_data, jumps=None):
+    """
+    Seat plugin wired to seat_data without an errbot instance, alerts are counted instead of sent
+    :param jumps: JumpGraph for the near commands, they answer that jump data is missing if None
+    """
+    plugin = Seat.__new__(Seat)
+    plugin.config = {'FUEL_THRESHOLD': '12', 'REPORT_POS_CHAN': '#pos', 'REPORT_REINF_CHAN': '#reinf'}
+    plugin.seat_data = seat_data
+    plugin.fuel_timer = None
+    plugin.fuel_checked_until = 0
+    plugin.anomalies_checked_until = 0
+    plugin.message_length = 1900
+    plugin.pages = PageCache()
+    plugin.jumps = jumps
+    plugin.alerts = 0
+
+    def count(channel, text):
+        plugin.alerts += 1
+
+    plugin.outbox = Outbox(count, rate=10 ** 6, delay=0)
+    # fuel re-checks are scheduled with timers, not needed for a single run
+    plugin._schedule_fuel_check = lambda threshold, now: None
+    return plugin
+
+
+def run(args):
+    process, url = fake_seat.start_process(latency=args.latency, corps=args.corps, towers=args.towers,
+                                           pocos=args.pocos)
+    try:
+        rss_start = peak_rss()
+        seat_data = SeatData('token', url, max_workers=args.workers, silo_workers=args.silo_workers)
+        # the fake SeAT serves a Fleet with the default systems, its jumps connect them
+        plugin = make_plugin(seat_data, JumpGraph(Fleet(corps=1, towers=0, pocos=0).jumps()))
+        results = {
+            'refresh_cold_s': timed(lambda: (seat_data.fetch_starbases(), seat_data.fetch_pocos())),
+            'refresh_warm_s': timed(lambda: (seat_data.fetch_starbases(), seat_data.fetch_pocos())),
+            'check_pos_s': timed(plugin._poller_check_pos),
+            'module_refresh_cold_s': timed(seat_data.refresh_pos_contents),
+            'check_pos_modules_s': timed(plugin._poller_check_pos_modules),
+        }
+        system = next(iter(seat_data.get_all_starbases())).solarsystem
+        results['commands_ms'] = time_commands(plugin, system, number=args.repeat)
+        results['peak_rss_bytes'] = peak_rss()
+        results['peak_rss_growth_bytes'] = results['peak_rss_bytes'] - rss_start
+        results['starbases'] = len(seat_data.starbases)
+        results['pocos'] = len(seat_data.pocos)
+        plugin.outbox.stop()
+    finally:
+        process.terminate()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corps', type=int, default=40)
+    parser.add_argument('--towers', type=int, default=1000)
+    parser.add_argument('--pocos', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every request')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--silo-workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20, help='runs per command')
+    parser.add_argument('--output', help='file to write the JSON results to, stdout if omitted')
+    args = parser.parse_args()
+
+    report = {
+        'parameters': vars(args),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': run(args),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Local stand-in for the SeAT v1 endpoints used by SeatData, serving a synthetic Fleet.
+Usage: python benchmarks/fake_seat.py [--port 8080] [--towers 1000] [--latency 0.05]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.fleet import Fleet  # noqa: E402
+
+
+class FakeSeatHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = self.route(self.path.split('?')[0].strip('/').split('/'))
+        if body is None:
+            self.respond(404, b'{"error": "not found"}')
+            return
+        payload = json.dumps(body).encode()
+        etag = '"%s"' % hashlib.sha1(payload).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.respond(304, b'', etag)
+        else:
+            self.respond(200, payload, etag)
+
+    def route(self, parts):
+        fleet = self.server.fleet
+        try:
+            i = parts.index('corporation')
+        except ValueError:
+            return None
+        endpoint, args = parts[i + 1], [int(arg) for arg in parts[i + 2:]]
+        if endpoint == 'all' and not args:
+            return fleet.corps
+        if endpoint == 'starbases' and len(args) == 1:
+            return fleet.starbases.get(args[0])
+        if endpoint == 'starbases' and len(args) == 2:
+            return {'modules': fleet.modules.get(args[1], [])}
+        if endpoint == 'pocos' and len(args) == 1:
+            return fleet.pocos.get(args[0])
+        if endpoint == 'assets-contents' and len(args) == 2:
+            return fleet.silo_contents(args[1])
+        return None
+
+    def respond(self, status, payload, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeSeatServer(ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+    def __init__(self, fleet, latency=0.0, port=0):
+        """
+        :param fleet: Fleet object to serve
+        :param latency: float Seconds every request is delayed
+        :param port: int Port to listen on, a free one if 0
+        """
+        super().__init__(('127.0.0.1', port), FakeSeatHandler)
+        self.fleet = fleet
+        self.latency = latency
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s/api/v1' % self.server_port
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def _serve(fleet_args, latency, ready):
+    server = FakeSeatServer(Fleet(**fleet_args), latency)
+    ready.put(server.url)
+    server.serve_forever()
+
+
+def start_process(latency=0.0, **fleet_args):
+    """
+    Runs a FakeSeatServer in its own process so it does not count towards the memory of the benchmark
+    :return: (process, url)
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(fleet_args, latency, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=120)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--corps', type=int, default=40)
+    parser.add_argument('--towers', type=int, default=1000)
+    parser.add_argument('--pocos', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+    server = FakeSeatServer(Fleet(corps=args.corps, towers=args.towers, pocos=args.pocos), args.latency, args.port)
+    print('Serving fake SeAT on %s' % server.url)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
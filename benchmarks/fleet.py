@@ -0,0 +1,108 @@
+"""Synthetic SeAT payloads for the benchmarks"""
+import datetime
+import random
+
+TOWER_TYPES = ['Amarr Control Tower', 'Caldari Control Tower Small', 'Gallente Control Tower Medium',
+               'Minmatar Control Tower', 'Dark Blood Control Tower']
+PLANET_TYPES = ['Planet (Gas)', 'Planet (Barren)', 'Planet (Temperate)', 'Planet (Lava)', 'Planet (Ice)']
+
+
+class Fleet:
+    """Deterministic fleet of corps, towers and pocos generated from a seed"""
+
+    def __init__(self, corps=40, towers=1000, pocos=1000, systems=500, seed=1, full=False):
+        """
+        :param corps: int Number of corporations
+        :param towers: int Number of towers spread over all corps
+        :param pocos: int Number of pocos spread over all corps
+        :param systems: int Number of solar systems the structures are spread over
+        :param seed: int Random seed
+        :param full: bool Add the columns SeAT returns but the plugin does not read, for realistic payload sizes
+        """
+        rng = random.Random(seed)
+        updated_at = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        self.corps = [{'corporationID': 98000000 + i, 'ticker': 'C%03d' % i} for i in range(corps)]
+        self.systems = ['System-%04d' % i for i in range(systems)]
+        self.seed = seed
+        self.starbases = {corp['corporationID']: [] for corp in self.corps}
+        self.pocos = {corp['corporationID']: [] for corp in self.corps}
+
+        for i in range(towers):
+            corpid = self.corps[i % corps]['corporationID']
+            system = rng.choice(self.systems)
+            self.starbases[corpid].append({
+                'itemID': 1000000000 + i,
+                'starbaseName': 'Tower %d' % i,
+                'starbaseTypeName': rng.choice(TOWER_TYPES),
+                'updated_at': updated_at,
+                'onAggression': 1,
+                'solarSystemName': system,
+                'moonName': '%s %s - Moon %s' % (system, rng.randint(1, 12), rng.randint(1, 20)),
+                'baseFuelUsage': 40,
+                'fuelBaySize': 140000,
+                'fuelBlocks': rng.randint(0, 28000),
+                'baseStrontUsage': 400,
+                'strontBaySize': 50000,
+                'strontium': rng.choice([0, 4000, 12000, 50000]),
+                'state': rng.choice([1, 3, 4, 4, 4, 4]),
+                'stateTimeStamp': updated_at,
+            })
+            if full:
+                self.starbases[corpid][-1].update({
+                    'corporationID': corpid, 'typeID': 12235, 'locationID': 30000000 + i % systems,
+                    'moonID': 40000000 + i, 'onlineTimeStamp': updated_at, 'standingOwnerID': corpid,
+                    'useStandingsFrom': corpid, 'onStandingDrop': 0, 'onStatusDrop': 0, 'onCorporationWar': 1,
+                    'allowCorporationMembers': 1, 'allowAllianceMembers': 1, 'created_at': updated_at,
+                    'security': round(rng.uniform(-1, 1), 1), 'itemName': None, 'mapName': system,
+                })
+
+        for i in range(pocos):
+            corpid = self.corps[i % corps]['corporationID']
+            system = rng.choice(self.systems)
+            self.pocos[corpid].append({
+                'itemID': 2000000000 + i,
+                'planetName': '%s %s' % (system, rng.randint(1, 12)),
+                'planetTypeName': rng.choice(PLANET_TYPES),
+                'reinforceHour': rng.randint(0, 23),
+                'solarSystemName': system,
+            })
+            if full:
+                self.pocos[corpid][-1].update({
+                    'corporationID': corpid, 'planetID': 40000000 + i, 'planetTypeID': 2016,
+                    'solarSystemID': 30000000 + i % systems, 'allowAlliance': 1, 'allowStandings': 0,
+                    'standingLevel': 'neutral', 'taxRateAlliance': 0.05, 'taxRateCorp': 0.05,
+                    'taxRateStandingHigh': 0.1, 'taxRateStandingGood': 0.1, 'taxRateStandingNeutral': 0.1,
+                    'taxRateStandingBad': 0.2, 'taxRateStandingHorrible': 0.2, 'created_at': updated_at,
+                    'updated_at': updated_at,
+                })
+
+        self.silos = {}  # siloID -> quantity
+        self.modules = {}  # posID -> module list
+        for starbaselist in self.starbases.values():
+            for starbase in starbaselist:
+                modules = []
+                for k in range(rng.randint(0, 4)):
+                    siloid = starbase['itemID'] * 10 + k
+                    self.silos[siloid] = rng.choice([0, 5000, 20000, 20050])
+                    modules.append({'detail': {'typeID': rng.choice([14343, 17982]), 'itemID': siloid,
+                                               'capacity': 20000}})
+                modules.append({'detail': {'typeID': 16213, 'itemID': starbase['itemID'] * 10 + 9, 'capacity': 0}})
+                self.modules[starbase['itemID']] = modules
+
+    def silo_contents(self, siloid):
+        quantity = self.silos.get(siloid, 0)
+        return [{'quantity': quantity}] if quantity else []
+
+    def jumps(self, extra=0.35, reach=30):
+        """
+        Stargate connections between the systems, a chain with short cuts between nearby systems, sparse like New Eden
+        :param extra: float Probability of a system getting a short cut
+        :param reach: int Maximum distance in the chain a short cut spans
+        :return: list of (system name, system name)
+        """
+        rng = random.Random(self.seed)
+        jumps = list(zip(self.systems, self.systems[1:]))
+        for i, system in enumerate(self.systems):
+            if rng.random() < extra:
+                jumps.append((system, self.systems[min(i + rng.randint(2, reach), len(self.systems) - 1)]))
+        return jumps
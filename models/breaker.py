@@ -0,0 +1,75 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing. After threshold consecutive failures the circuit opens and calls
+    are rejected without touching the network. Once reset seconds passed a single trial call is let through, its
+    outcome closes or reopens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=5, reset=60):
+        """
+        :param threshold: int Consecutive failures that open the circuit
+        :param reset: float Seconds the circuit stays open before a trial call
+        """
+        self.threshold = threshold
+        self.reset = reset
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        :return: bool True if a call may be made
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset:
+                # let exactly one trial call through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Number of retries a single poll may spend over all of its requests, so a struggling SeAT is not hit with
+    retries of every request at once.
+    """
+
+    def __init__(self, retries):
+        """
+        :param retries: int Retries available
+        """
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        :return: bool True if a retry was available and is now spent
+        """
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
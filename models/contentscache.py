@@ -0,0 +1,57 @@
+import time
+
+
+class ContentsCache:
+    """
+    Snapshot of pos modules and silo contents keyed by (corpID, posID, itemID).
+    Entries expire per tower after ttl seconds and are refreshed by SeatData.refresh_pos_contents.
+    """
+
+    def __init__(self, ttl=3600):
+        """
+        :param ttl: int Seconds after which the contents of a tower are considered stale
+        """
+        self.ttl = ttl
+        self.modules = {}  # (corpID, posID, itemID) -> Module
+        self.towers = {}  # (corpID, posID) -> list of itemIDs
+        self.updated = {}  # (corpID, posID) -> unix timestamp of the last refresh
+
+    def is_expired(self, corpid, posid, now=None):
+        now = now if now is not None else time.time()
+        return now - self.updated.get((corpid, posid), 0) >= self.ttl
+
+    def store(self, corpid, posid, modules, now=None):
+        """
+        Replace the modules of a tower
+        :param corpid: int corporationID
+        :param posid: int itemID of the tower
+        :param modules: list of Module objects
+        :param now: float unix timestamp of the refresh
+        """
+        for module in modules:
+            self.modules[(corpid, posid, module.itemID)] = module
+        itemids = [module.itemID for module in modules]
+        old = self.towers.get((corpid, posid), [])
+        # swap the list last so readers never see a half stored tower
+        self.towers[(corpid, posid)] = itemids
+        self.updated[(corpid, posid)] = now if now is not None else time.time()
+        for itemid in set(old) - set(itemids):
+            self.modules.pop((corpid, posid, itemid), None)
+
+    def get(self, corpid, posid):
+        """
+        :return: list of Module objects of a tower, None if the tower was never fetched
+        """
+        itemids = self.towers.get((corpid, posid))
+        if itemids is None:
+            return None
+        modules = (self.modules.get((corpid, posid, itemid)) for itemid in itemids)
+        return [module for module in modules if module is not None]
+
+    def drop(self, corpid, posid):
+        for itemid in self.towers.pop((corpid, posid), []):
+            self.modules.pop((corpid, posid, itemid), None)
+        self.updated.pop((corpid, posid), None)
+
+    def __len__(self):
+        return len(self.towers)
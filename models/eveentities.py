@@ -1,8 +1,15 @@
 
 class Corp:
-    def __init__(self, corp):
+    __slots__ = ('corporationID', 'ticker', 'source')
+
+    def __init__(self, corp, source=''):
         """
         :param corp: dict of corp data
+        :param source: str name of the SeAT instance the corp is fetched from, '' for the default one
         """
         self.corporationID = corp['corporationID']
         self.ticker = corp['ticker']
+        self.source = source
+
+    def __str__(self):
+        return '%s@%s' % (self.ticker, self.source) if self.source else self.ticker
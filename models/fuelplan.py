@@ -0,0 +1,89 @@
+import math
+from models.starbases import Starbase
+
+try:
+    import numpy
+except ImportError:  # optional, the plan is computed in plain python without it
+    numpy = None
+
+FUEL_BLOCK_VOLUME = 5  # m3 per fuel block
+STRONT_VOLUME = 3  # m3 per strontium clathrate
+
+
+class FuelPlan:
+    """
+    Fuel blocks and strontium needed to keep all online towers running for a number of days, per system and corp.
+    Fuel covers the consumption of the period, measured usage if known, minus what is left in the bay. Strontium tops
+    the bay up. A tower whose bay can not take all the fuel of the period at once is counted as short.
+    """
+
+    # columns of the per system and per corp rows after the group name
+    COLUMNS = ('towers', 'fuel', 'loadable', 'stront', 'short')
+
+    def __init__(self, starbases, days, now):
+        """
+        :param starbases: iterable of Starbase objects, only online towers are planned
+        :param days: float Days to plan for
+        :param now: float unix timestamp
+        """
+        self.days = days
+        starbases = [starbase for starbase in starbases if starbase.state == Starbase.STATE_ONLINE]
+        if numpy is not None:
+            self.systems, self.corps, self.total = self._plan_numpy(starbases, days, now)
+        else:
+            self.systems, self.corps, self.total = self._plan_python(starbases, days, now)
+
+    @staticmethod
+    def _plan_numpy(starbases, days, now):
+        """All towers at once, one array per column and a bincount per group"""
+        if not starbases:
+            return [], [], (0,) * len(FuelPlan.COLUMNS)
+        rate = numpy.array([starbase.fuel_rate or starbase.baseFuelUsage for starbase in starbases], dtype=float)
+        fuel = numpy.array([starbase.fuelBlocks for starbase in starbases], dtype=float)
+        updated = numpy.array([starbase.updated for starbase in starbases], dtype=float)
+        fuel_bay = numpy.array([starbase.fuelBaySize for starbase in starbases], dtype=float)
+        stront = numpy.array([starbase.strontium for starbase in starbases], dtype=float)
+        stront_bay = numpy.array([starbase.strontBaySize for starbase in starbases], dtype=float)
+
+        # fuel burnt since the last api update
+        fuel = numpy.maximum(fuel - rate * (now - updated) / 3600, 0)
+        needed = numpy.ceil(numpy.maximum(rate * 24 * days - fuel, 0))
+        room = numpy.maximum(numpy.floor(fuel_bay / FUEL_BLOCK_VOLUME) - fuel, 0)
+        loadable = numpy.minimum(needed, numpy.floor(room))
+        stront_needed = numpy.maximum(numpy.floor(stront_bay / STRONT_VOLUME) - stront, 0)
+        columns = numpy.stack([numpy.ones(len(starbases)), needed, loadable, stront_needed, needed > loadable])
+
+        def group(keys):
+            # dense group numbers in first seen order, cheaper than sorting the names with numpy.unique
+            codes = {}
+            inverse = numpy.fromiter((codes.setdefault(key, len(codes)) for key in keys), dtype=numpy.intp,
+                                     count=len(starbases))
+            sums = numpy.stack([numpy.bincount(inverse, weights=column, minlength=len(codes)) for column in columns])
+            return sorted((name,) + tuple(row) for name, row in zip(codes, sums.T.astype(numpy.int64).tolist()))
+
+        return (group([starbase.solarsystem for starbase in starbases]),
+                group([str(starbase.corp) for starbase in starbases]),
+                tuple(int(total) for total in columns.sum(axis=1)))
+
+    @staticmethod
+    def _plan_python(starbases, days, now):
+        systems, corps = {}, {}
+        total = [0] * len(FuelPlan.COLUMNS)
+        for starbase in starbases:
+            rate = starbase.fuel_rate or starbase.baseFuelUsage
+            fuel = max(starbase.fuelBlocks - rate * (now - starbase.updated) / 3600, 0)
+            needed = math.ceil(max(rate * 24 * days - fuel, 0))
+            loadable = min(needed, math.floor(max(starbase.fuelBaySize // FUEL_BLOCK_VOLUME - fuel, 0)))
+            stront_needed = max(starbase.strontBaySize // STRONT_VOLUME - starbase.strontium, 0)
+            row = (1, needed, loadable, stront_needed, int(needed > loadable))
+            for sums in (systems.setdefault(starbase.solarsystem, [0] * len(row)),
+                         corps.setdefault(str(starbase.corp), [0] * len(row)), total):
+                for i, value in enumerate(row):
+                    sums[i] += value
+        return ([(name,) + tuple(sums) for name, sums in sorted(systems.items())],
+                [(name,) + tuple(sums) for name, sums in sorted(corps.items())], tuple(total))
+
+    @staticmethod
+    def volume(fuel, stront):
+        """:return: int m3 of the given fuel blocks and strontium"""
+        return fuel * FUEL_BLOCK_VOLUME + stront * STRONT_VOLUME
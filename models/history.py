@@ -0,0 +1,146 @@
+import math
+import sqlite3
+import threading
+
+
+class History:
+    """
+    Append-only SQLite store of tower fuel/strontium and silo quantity samples.
+    Samples are keyed by (id, timestamp) in WITHOUT ROWID tables, so range queries of a tower or silo are a single
+    b-tree walk and a sample costs a few dozen bytes. Rates are estimated for all towers or silos in one query.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS tower_samples (starbase_id INTEGER NOT NULL, ts INTEGER NOT NULL, "
+        "fuel INTEGER NOT NULL, stront INTEGER NOT NULL, PRIMARY KEY (starbase_id, ts)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS silo_samples (silo_id INTEGER NOT NULL, ts INTEGER NOT NULL, "
+        "starbase_id INTEGER NOT NULL, quantity INTEGER NOT NULL, PRIMARY KEY (silo_id, ts)) WITHOUT ROWID",
+    )
+    # the rate queries use window functions
+    MIN_SQLITE_VERSION = (3, 25, 0)
+
+    def __init__(self, path, retention=30 * 86400):
+        """
+        :param path: str file of the database, ':memory:' for a temporary one
+        :param retention: int Seconds samples are kept, see prune
+        :raises sqlite3.Error: if the database can not be opened or SQLite is older than MIN_SQLITE_VERSION
+        """
+        if sqlite3.sqlite_version_info < self.MIN_SQLITE_VERSION:
+            raise sqlite3.NotSupportedError("SQLite %s is too old, history needs %s or newer" % (
+                sqlite3.sqlite_version, '.'.join(map(str, self.MIN_SQLITE_VERSION))))
+        self.path = path
+        self.retention = retention
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.db.execute(statement)
+        self.db.commit()
+        self.pruned_at = 0
+        self._lock = threading.Lock()
+
+    def add_tower_samples(self, samples):
+        """
+        :param samples: list of (starbase id, unix timestamp of the api update, fuel blocks, strontium)
+        """
+        if not samples:
+            return
+        with self._lock:
+            # the same api update is only stored once
+            self.db.executemany("INSERT OR IGNORE INTO tower_samples VALUES (?, ?, ?, ?)", samples)
+            self.db.commit()
+
+    def add_silo_samples(self, samples):
+        """
+        :param samples: list of (silo id, unix timestamp of the fetch, starbase id, quantity)
+        """
+        if not samples:
+            return
+        with self._lock:
+            self.db.executemany("INSERT OR IGNORE INTO silo_samples VALUES (?, ?, ?, ?)", samples)
+            self.db.commit()
+
+    def tower_samples(self, starbaseid, start, end):
+        """
+        :param starbaseid: int starbase id
+        :param start: float unix timestamp
+        :param end: float unix timestamp
+        :return: list of (timestamp, fuel blocks, strontium) in [start, end), oldest first
+        """
+        with self._lock:
+            return self.db.execute("SELECT ts, fuel, stront FROM tower_samples WHERE starbase_id = ? AND ts >= ? "
+                                   "AND ts < ? ORDER BY ts", (starbaseid, start, end)).fetchall()
+
+    def silo_samples(self, siloid, start, end):
+        """
+        :param siloid: int item id of the silo
+        :param start: float unix timestamp
+        :param end: float unix timestamp
+        :return: list of (timestamp, quantity) in [start, end), oldest first
+        """
+        with self._lock:
+            return self.db.execute("SELECT ts, quantity FROM silo_samples WHERE silo_id = ? AND ts >= ? AND ts < ? "
+                                   "ORDER BY ts", (siloid, start, end)).fetchall()
+
+    def fuel_rates(self, since, min_span=6 * 3600):
+        """
+        Measured fuel consumption of every tower. Intervals in which fuel went up are refuels and left out.
+        :param since: float unix timestamp of the oldest sample to use
+        :param min_span: int Seconds of consumption a tower needs before its rate is trusted
+        :return: dict starbase id -> fuel blocks per hour
+        """
+        with self._lock:
+            rows = self.db.execute("""
+                WITH intervals AS (
+                    SELECT starbase_id, ts - LAG(ts) OVER w AS seconds, LAG(fuel) OVER w - fuel AS used
+                    FROM tower_samples WHERE ts >= ?
+                    WINDOW w AS (PARTITION BY starbase_id ORDER BY ts))
+                SELECT starbase_id, SUM(used) * 3600.0 / SUM(seconds) FROM intervals
+                WHERE used >= 0 AND seconds > 0 GROUP BY starbase_id HAVING SUM(seconds) >= ?""",
+                                   (since, min_span)).fetchall()
+        return dict(rows)
+
+    def silo_anomalies(self, since, after=0, min_intervals=4, deviations=3, tolerance=0.05):
+        """
+        Silos whose latest fill rate is clearly below their usual one, as a siphon stealing from the silo would cause.
+        Intervals in which the quantity went down were emptied by players and are left out.
+        :param since: float unix timestamp of the oldest sample to use
+        :param after: float only report silos whose latest sample is newer
+        :param min_intervals: int Intervals a silo needs before its usual rate is trusted
+        :param deviations: float Standard deviations the latest rate must be below the usual one
+        :param tolerance: float Fraction of the usual rate the latest one must be below in any case
+        :return: list of (silo id, starbase id, latest rate, usual rate), rates in units per hour
+        """
+        with self._lock:
+            rows = self.db.execute("""
+                WITH intervals AS (
+                    SELECT silo_id, starbase_id, ts, quantity, LEAD(ts) OVER w IS NULL AS latest,
+                           quantity - LAG(quantity) OVER w AS added,
+                           (quantity - LAG(quantity) OVER w) * 3600.0 / (ts - LAG(ts) OVER w) AS rate
+                    FROM silo_samples WHERE ts >= ?
+                    WINDOW w AS (PARTITION BY silo_id ORDER BY ts))
+                SELECT silo_id, MAX(starbase_id), MAX(CASE WHEN latest THEN rate END),
+                       AVG(CASE WHEN NOT latest THEN rate END), AVG(CASE WHEN NOT latest THEN rate * rate END)
+                FROM intervals WHERE rate IS NOT NULL AND added >= 0 AND quantity > 0
+                GROUP BY silo_id HAVING MAX(CASE WHEN latest THEN ts END) > ? AND COUNT(*) > ?""",
+                                   (since, after, min_intervals)).fetchall()
+        anomalies = []
+        for siloid, starbaseid, rate, mean, square in rows:
+            deviation = math.sqrt(max(square - mean * mean, 0))
+            if rate < mean - max(deviations * deviation, tolerance * abs(mean)):
+                anomalies.append((siloid, starbaseid, rate, mean))
+        return anomalies
+
+    def prune(self, now):
+        """Deletes samples older than the retention, at most once a day"""
+        if now - self.pruned_at < 86400:
+            return
+        self.pruned_at = now
+        with self._lock:
+            self.db.execute("DELETE FROM tower_samples WHERE ts < ?", (now - self.retention,))
+            self.db.execute("DELETE FROM silo_samples WHERE ts < ?", (now - self.retention,))
+            self.db.commit()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
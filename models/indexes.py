@@ -0,0 +1,98 @@
+import bisect
+import math
+
+
+class Index:
+    """
+    Secondary index that maps a derived key to the records having it.
+    Records need an id attribute, keys are computed once when a record is added.
+    The records of a key are returned ordered by id, so results do not depend on the order records were added in,
+    e.g. by concurrent fetches.
+    """
+
+    def __init__(self, key):
+        """
+        :param key: function returning the index key of a record
+        """
+        self.key = key
+        self.buckets = {}  # key -> {id: record}
+        self.keys = {}  # id -> key
+        self.unsorted = set()  # keys whose bucket is not in id order, sorted on the next get
+
+    def add(self, record):
+        self.remove(record.id)
+        key = self.key(record)
+        self.keys[record.id] = key
+        bucket = self.buckets.setdefault(key, {})
+        if bucket and record.id < next(reversed(bucket)):
+            self.unsorted.add(key)
+        bucket[record.id] = record
+
+    def remove(self, id):
+        if id not in self.keys:
+            return
+        key = self.keys.pop(id)
+        bucket = self.buckets[key]
+        del bucket[id]
+        if not bucket:
+            del self.buckets[key]
+            self.unsorted.discard(key)
+
+    def get(self, key):
+        """
+        :return: list of records with the given key, ordered by id
+        """
+        if key in self.unsorted:
+            self.buckets[key] = dict(sorted(self.buckets[key].items()))
+            self.unsorted.discard(key)
+        return list(self.buckets.get(key, {}).values())
+
+    def count(self, key):
+        return len(self.buckets.get(key, ()))
+
+
+class RangeIndex:
+    """
+    Secondary index that keeps records ordered by a numeric key for range queries.
+    """
+
+    def __init__(self, key):
+        """
+        :param key: function returning the sort key of a record
+        """
+        self.key = key
+        self.entries = []  # sorted list of (key, id)
+        self.keys = {}  # id -> key
+        self.records = {}  # id -> record
+
+    def add(self, record):
+        self.remove(record.id)
+        key = self.key(record)
+        self.keys[record.id] = key
+        self.records[record.id] = record
+        bisect.insort(self.entries, (key, record.id))
+
+    def remove(self, id):
+        if id not in self.keys:
+            return
+        key = self.keys.pop(id)
+        del self.records[id]
+        del self.entries[bisect.bisect_left(self.entries, (key, id))]
+
+    def range(self, start, end):
+        """
+        :return: list of records with start <= key < end, ordered by key
+        """
+        lo = bisect.bisect_left(self.entries, (start,))
+        hi = bisect.bisect_left(self.entries, (end,))
+        records = (self.records.get(id) for _, id in self.entries[lo:hi])
+        return [record for record in records if record is not None]
+
+    def first_after(self, value):
+        """
+        :return: the record with the smallest key greater than value, None if there is none
+        """
+        i = bisect.bisect_right(self.entries, (value, math.inf))
+        if i == len(self.entries):
+            return None
+        return self.records.get(self.entries[i][1])
@@ -0,0 +1,50 @@
+import codecs
+import json
+import re
+
+# whitespace and separators in front of the next element of an array
+_SEPARATOR = re.compile(r'[\s,]*')
+_WHITESPACE = re.compile(r'\s*')
+_decoder = json.JSONDecoder()
+
+
+def iter_array(chunks):
+    """
+    Decodes a JSON array of objects element by element, only the current element and chunk are held in memory
+    :param chunks: iterable of bytes, e.g. Response.iter_content
+    :return: generator of the decoded elements
+    :raises ValueError: if the document is not a complete JSON array
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    skip = _WHITESPACE
+    while True:
+        # move to the next element, refilling the buffer whenever it runs dry
+        pos = skip.match(buffer, pos).end()
+        while pos == len(buffer):
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("JSON array ended early")
+            buffer = utf8.decode(chunk)
+            pos = skip.match(buffer).end()
+        if skip is _WHITESPACE:
+            if buffer[pos] != '[':
+                raise ValueError("Expected a JSON array")
+            skip = _SEPARATOR
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+        while True:
+            try:
+                element, pos = _decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                # the element continues in the next chunk
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise
+                buffer, pos = buffer[pos:] + utf8.decode(chunk), 0
+        yield element
@@ -0,0 +1,111 @@
+import csv
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class JumpGraph:
+    """
+    Stargate connections between solar systems, loaded once from a static file.
+    Systems are numbered, the adjacency lists of all systems are stored back to back in a single integer array.
+    The breadth first search from a system is kept as its systems ordered by distance plus the number of systems
+    within each distance, so the systems within N jumps are a prefix of that row.
+    """
+
+    def __init__(self, jumps, cached_rows=128):
+        """
+        :param jumps: iterable of (system name, system name) pairs, one per stargate connection in either direction
+        :param cached_rows: int Number of breadth first search rows kept, the least recently used ones are dropped
+        """
+        self.names = []  # system id -> name
+        self.ids = {}  # casefolded name -> system id
+        neighbours = []
+        for a, b in jumps:
+            a, b = self._intern(a, neighbours), self._intern(b, neighbours)
+            if a != b:
+                neighbours[a].add(b)
+                neighbours[b].add(a)
+        # neighbours of system i are adjacency[offsets[i]:offsets[i + 1]]
+        self.offsets = array('I', [0])
+        self.adjacency = array('I')
+        for linked in neighbours:
+            self.adjacency.extend(sorted(linked))
+            self.offsets.append(len(self.adjacency))
+        self.cached_rows = cached_rows
+        self.rows = OrderedDict()  # system id -> (array of system ids by distance, list of counts per distance)
+        self._lock = threading.Lock()
+
+    def _intern(self, name, neighbours):
+        key = name.strip().casefold()
+        id = self.ids.get(key)
+        if id is None:
+            id = self.ids[key] = len(self.names)
+            self.names.append(name.strip())
+            neighbours.append(set())
+        return id
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: str CSV file with a header and the columns fromSolarSystemName and toSolarSystemName,
+                     further columns are ignored
+        :return: JumpGraph object
+        """
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls((row['fromSolarSystemName'], row['toSolarSystemName']) for row in csv.DictReader(f))
+
+    def __contains__(self, system):
+        return system.casefold() in self.ids
+
+    def __len__(self):
+        return len(self.names)
+
+    def name(self, system):
+        """:return: str spelling of a system name in the jump data, None if it is unknown"""
+        id = self.ids.get(system.casefold())
+        return self.names[id] if id is not None else None
+
+    def _row(self, source):
+        with self._lock:
+            row = self.rows.get(source)
+            if row is not None:
+                self.rows.move_to_end(source)
+                return row
+        order = array('I', [source])
+        within = [1]  # within[n] = number of systems at most n jumps away
+        seen = bytearray(len(self.names))
+        seen[source] = 1
+        start = 0
+        while start < len(order):
+            end = len(order)
+            for i in range(start, end):
+                system = order[i]
+                for neighbour in self.adjacency[self.offsets[system]:self.offsets[system + 1]]:
+                    if not seen[neighbour]:
+                        seen[neighbour] = 1
+                        order.append(neighbour)
+            start = end
+            if len(order) > end:
+                within.append(len(order))
+        row = (order, within)
+        with self._lock:
+            self.rows[source] = row
+            while len(self.rows) > self.cached_rows:
+                self.rows.popitem(last=False)
+        return row
+
+    def within(self, system, jumps):
+        """
+        :param system: str solar system name, case insensitive
+        :param jumps: int Maximum number of jumps
+        :return: list of (system name, jumps) ordered by jumps, the system itself first, None if the system is unknown
+        """
+        source = self.ids.get(system.casefold())
+        if source is None:
+            return None
+        order, within = self._row(source)
+        systems = []
+        for distance in range(min(jumps, len(within) - 1) + 1):
+            first = within[distance - 1] if distance else 0
+            systems.extend((self.names[id], distance) for id in order[first:within[distance]])
+        return systems
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Collects alerts and sends them as one digest per channel and kind from a background thread,
+    so the pollers never wait on the chat backend and the backend is not flooded.
+    """
+
+    def __init__(self, send, rate=1.0, delay=2, max_length=1900):
+        """
+        :param send: function(channel, text) delivering a single message
+        :param rate: float Maximum number of messages sent per second
+        :param delay: float Seconds to wait for more alerts before a digest is sent
+        :param max_length: int Maximum length of a single message
+        """
+        self.send = send
+        self.rate = rate
+        self.delay = delay
+        self.max_length = max_length
+        self.pending = {}  # (channel, kind) -> list of lines
+        self.added = 0  # number of alerts queued so far
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._last_send = 0
+        self._thread = threading.Thread(target=self._run, name='seat-outbox', daemon=True)
+        self._thread.start()
+
+    def add(self, channel, kind, text):
+        """
+        Queues an alert, returns immediately
+        :param channel: str channel identifier
+        :param kind: str alert kind used as digest title, e.g. Fuel
+        :param text: str alert text
+        """
+        with self._lock:
+            self.pending.setdefault((channel, kind), []).append(text)
+            self.added += 1
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def render(self):
+        """
+        Takes all pending alerts and renders them
+        :return: list of (channel, text) messages
+        """
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        messages = []
+        for (channel, kind), lines in pending.items():
+            if len(lines) == 1:
+                messages.append((channel, "**%s:** %s" % (kind, lines[0])))
+                continue
+            text = "**%s:** %s alerts" % (kind, len(lines))
+            for line in lines:
+                if len(text) + len(line) + 1 > self.max_length:
+                    messages.append((channel, text))
+                    text = "**%s:** (continued)" % kind
+                text += "\n" + line
+            messages.append((channel, text))
+        return messages
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            # give the running check time to add the rest of its alerts
+            self._stopped.wait(self.delay)
+            self._wakeup.clear()
+            for channel, text in self.render():
+                self._throttle()
+                try:
+                    self.send(channel, text)
+                except Exception:
+                    log.exception("Sending to %s failed", channel)
+
+    def _throttle(self):
+        wait = self._last_send + 1 / self.rate - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_send = time.time()
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+
+def paginate(lines, max_length=1900):
+    """
+    Joins lines into as few messages as possible
+    :param lines: iterable of str, a line is never split, one longer than max_length gets a message of its own
+    :param max_length: int Maximum length of a message
+    :return: list of str messages, at least one
+    """
+    pages = []
+    page = None
+    for line in lines:
+        if page is not None and len(page) + len(line) + 1 <= max_length:
+            page += "\n" + line
+            continue
+        if page is not None:
+            pages.append(page)
+        page = line
+    pages.append(page if page is not None else "")
+    return pages
+
+
+class PageCache:
+    """
+    Rendered pages of command results keyed by command and arguments.
+    An entry is valid as long as the data generation it was rendered from (see SeatData.generation) is current and
+    it is younger than ttl seconds, as results like hours of fuel left also change with time.
+    """
+
+    def __init__(self, max_entries=64, ttl=300):
+        """
+        :param max_entries: int Number of results kept, the least recently used ones are dropped first
+        :param ttl: float Seconds a result is served at most
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (generation, rendered at, list of pages)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, generation, now, render):
+        """
+        :param key: hashable command and arguments
+        :param generation: int data generation the result has to be rendered from
+        :param now: float unix timestamp
+        :param render: function() -> list of str pages, called on a miss
+        :return: list of str pages
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == generation and now - entry[1] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        # render outside the lock, concurrent misses of the same key only cost a second rendering
+        pages = render()
+        with self._lock:
+            self.entries[key] = (generation, now, pages)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return pages
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,13 +1,42 @@
 
+import sys
+
+
 class Poco:
+    __slots__ = ('id', 'corp', 'planetName', 'planetTypeName', 'reinforceHour', 'solarsystem')
+
+    # JSON keys in the order of the serialized form
+    FIELDS = ('itemID', 'planetName', 'planetTypeName', 'reinforceHour', 'solarSystemName')
+
     def __init__(self, poco, corp):
         self.id = poco['itemID']
         self.corp = corp
         self.planetName = poco['planetName']
-        self.planetTypeName = poco['planetTypeName']
+        self.planetTypeName = sys.intern(poco['planetTypeName'])
         self.reinforceHour = poco['reinforceHour']
-        self.solarsystem = poco['solarSystemName']
+        self.solarsystem = sys.intern(poco['solarSystemName'])
 
     @property
     def corpticker(self):
         return self.corp.ticker
+
+    def fields(self):
+        """
+        :return: tuple of the FIELDS values, equal tuples mean equal api data
+        """
+        return self.id, self.planetName, self.planetTypeName, self.reinforceHour, self.solarsystem
+
+    def serialize(self):
+        """
+        :return: tuple (corporationID, FIELDS values...)
+        """
+        return (self.corp.corporationID,) + self.fields()
+
+    @classmethod
+    def deserialize(cls, data, corps):
+        """
+        :param data: tuple as returned by serialize
+        :param corps: dict corporationID -> Corp object
+        :return: Poco object
+        """
+        return cls(dict(zip(cls.FIELDS, data[1:])), corps[data[0]])
@@ -0,0 +1,54 @@
+class RefreshScheduler:
+    """
+    Decides when the data of a corp is refetched.
+    SeAT only gets new starbase data once the EVE cache timer expired, so a corp is due again interval seconds after
+    its last update. Corps that are overdue are polled every min_interval seconds, corps whose data went stale (keys
+    not updating) are backed off exponentially. Due times are staggered by corp to spread the load.
+    """
+
+    def __init__(self, interval=3600, min_interval=600, max_backoff=6 * 3600, stagger=300):
+        """
+        :param interval: int Seconds between two updates of a corp's data, the cache timer
+        :param min_interval: int Minimum seconds between two fetches of a corp
+        :param max_backoff: int Maximum seconds between two fetches of a stale corp
+        :param stagger: int Due times are spread over this many seconds
+        """
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_backoff = max_backoff
+        self.stagger = stagger
+        self.due = {}  # (kind, corpID) -> unix timestamp of the next fetch
+        self.backoff = {}  # (kind, corpID) -> seconds, only for stale corps
+
+    def is_due(self, kind, corpid, now):
+        """
+        :param kind: str starbases or pocos
+        :param corpid: int corporationID
+        :param now: float unix timestamp
+        :return: bool True if the corp should be fetched, unknown corps are always due
+        """
+        return self.due.get((kind, corpid), 0) <= now
+
+    def schedule(self, kind, corpid, now, updated=None, stale=False):
+        """
+        Plans the next fetch of a corp after it was fetched
+        :param kind: str starbases or pocos
+        :param corpid: int corporationID
+        :param now: float unix timestamp of the fetch
+        :param updated: float unix timestamp of the newest record of the corp, None if unknown
+        :param stale: bool True if the corp's data is outdated
+        :return: float unix timestamp of the next fetch
+        """
+        key = (kind, corpid)
+        if stale:
+            backoff = min(self.backoff.get(key, self.interval / 2) * 2, self.max_backoff)
+            self.backoff[key] = backoff
+            due = now + backoff
+        else:
+            self.backoff.pop(key, None)
+            expected = updated + self.interval if updated is not None else now + self.interval
+            due = max(expected, now + self.min_interval)
+        # multiplicative hash, corpIDs are often consecutive
+        due += corpid * 2654435761 % 2 ** 32 % self.stagger if self.stagger else 0
+        self.due[key] = due
+        return due
@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from models.breaker import CircuitBreaker
+from models.jsonstream import iter_array
+
+log = logging.getLogger(__name__)
+
+# Returned instead of the payload when a conditional request found nothing new
+NOT_MODIFIED = object()
+# Returned instead of the payload when the request failed or its circuit is open, callers keep the data they have
+STALE = object()
+
+
+def http_session(pool_size=8, hosts=10):
+    """
+    Keep-alive connection pools, one per host, that several SeatSessions can share
+    :param pool_size: int Number of connections kept open to a host
+    :param hosts: int Number of hosts pools are kept for
+    :return: requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class SeatSession:
+    """
+    Api client of a single SeAT instance on a keep-alive http session.
+    Remembers the validators and body digest of every response so unchanged payloads are neither re-downloaded nor
+    re-parsed. The payloads themselves are not kept, callers asking for NOT_MODIFIED hold on to the data they have.
+    Every endpoint has its own circuit breaker, so an outage costs a rejected call instead of a timeout per request.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, seat_token, seat_url, timeout=30, pool_size=8, stats=None, retries=2, backoff=0.5,
+                 max_backoff=8, breaker_threshold=5, breaker_reset=60, http=None, name=''):
+        """
+        :param seat_token: SeAT api token
+        :param seat_url: SeAT api url
+        :param timeout: int Seconds to wait for a single api request
+        :param pool_size: int Number of connections kept open to SeAT
+        :param stats: Stats object requests are recorded in, nothing is recorded if None
+        :param retries: int Maximum retries of a single request
+        :param backoff: float Seconds the first retry waits at most, doubled for every further retry
+        :param max_backoff: float Maximum seconds to wait before a retry
+        :param breaker_threshold: int Consecutive failures that open the circuit of an endpoint
+        :param breaker_reset: float Seconds an open circuit rejects calls before a trial request
+        :param http: requests.Session shared with other SeatSessions, see http_session. An own one if None
+        :param name: str name of the SeAT instance, prefixes the endpoints in stats
+        """
+        self.seat_url = seat_url
+        self.name = name
+        self.stats = stats
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers = {}  # endpoint -> CircuitBreaker
+        self._breakers_lock = threading.Lock()
+        # the token goes with every request so the connection pools can be shared between instances
+        self.headers = {'X-Token': seat_token, 'Accept': 'application/json'}
+        self.owns_session = http is None
+        self.session = http_session(pool_size, 1) if http is None else http
+        self.cache = {}  # url -> CacheEntry
+
+    def get(self, path, if_changed=False, endpoint=None, budget=None):
+        """
+        GET an api path and decode the JSON body. Failed requests are retried with jittered exponential backoff while
+        the budget lasts.
+        :param path: str path below the api url, e.g. /corporation/all
+        :param if_changed: bool Send the validators of the last response and return NOT_MODIFIED if the payload did not
+                           change since, the payload is always fetched and decoded if False
+        :param endpoint: str endpoint class the circuit breaker and stats are kept for, the path if None
+        :param budget: RetryBudget the retries are taken from, failed requests are not retried if None
+        :return: decoded JSON, NOT_MODIFIED, or STALE if the request failed or the circuit is open
+        """
+        return self._call(path, endpoint or path, budget, lambda: self._get(path, if_changed))
+
+    def stream_array(self, path, endpoint=None, budget=None):
+        """
+        Conditional GET of an api path returning a JSON array, the body is decoded while it is read.
+        Nothing of the payload is cached, only its validators.
+        :param path: str path below the api url, e.g. /corporation/starbases/123
+        :param endpoint: str endpoint class the circuit breaker and stats are kept for, the path if None
+        :param budget: RetryBudget the retries are taken from, failed requests are not retried if None
+        :return: generator of dicts, NOT_MODIFIED, or STALE if the request failed or the circuit is open. The generator
+        raises requests.exceptions.RequestException or ValueError if the body breaks off or is no JSON array.
+        """
+        endpoint = endpoint or path
+        return self._call(path, endpoint, budget, lambda: self._stream(path, endpoint))
+
+    def _call(self, path, endpoint, budget, request):
+        """
+        Runs request behind the circuit breaker of the endpoint, retrying failures while the budget lasts
+        :param request: function returning (data, number of bytes received)
+        :return: data, or STALE if the request failed or the circuit is open
+        """
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            self._record(endpoint, 0, rejected=True)
+            return STALE
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                data, nbytes = request()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self._record(endpoint, time.perf_counter() - start, failed=True)
+                breaker.failure()
+                if (attempt >= self.retries or not self._retryable(e) or budget is None or not breaker.allow() or
+                        not budget.take()):
+                    log.warning("SeAT request %s%s failed: %s", self.seat_url, path, e)
+                    return STALE
+                # full jitter, concurrent retries do not hit SeAT in lockstep
+                time.sleep(random.uniform(0, min(self.backoff * 2 ** attempt, self.max_backoff)))
+                attempt += 1
+                continue
+            breaker.success()
+            self._record(endpoint, time.perf_counter() - start, nbytes, not_modified=data is NOT_MODIFIED)
+            return data
+
+    def breaker(self, endpoint):
+        """
+        :param endpoint: str endpoint class
+        :return: the CircuitBreaker of the endpoint
+        """
+        with self._breakers_lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return breaker
+
+    @staticmethod
+    def _retryable(error):
+        """Connection problems, timeouts and server errors are retried, client errors are not"""
+        if isinstance(error, requests.exceptions.HTTPError):
+            return error.response is not None and (error.response.status_code >= 500 or
+                                                   error.response.status_code == 429)
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+    def _record(self, endpoint, seconds, nbytes=0, **flags):
+        if self.stats is not None:
+            self.stats.record_request('%s/%s' % (self.name, endpoint) if self.name else endpoint, seconds, nbytes,
+                                      **flags)
+
+    def _get(self, path, if_changed):
+        """
+        :return: (decoded JSON or NOT_MODIFIED, number of bytes received)
+        """
+        url = "{0}{1}".format(self.seat_url, path)
+        entry = self.cache.get(url) if if_changed else None
+        headers = dict(self.headers)
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        r = self.session.get(url, headers=headers, timeout=self.timeout)
+        r.raise_for_status()
+        nbytes = len(r.content)
+        if r.status_code == 304 and entry is not None:
+            return NOT_MODIFIED, nbytes
+
+        # SeAT does not always send validators, fall back to hashing the body
+        digest = hashlib.sha1(r.content).digest()
+        if entry is not None and entry.digest == digest:
+            return NOT_MODIFIED, nbytes
+
+        data = r.json()
+        if r.status_code == 200:
+            self.cache[url] = CacheEntry(r.headers.get('ETag'), r.headers.get('Last-Modified'), digest)
+        return data, nbytes
+
+    def _stream(self, path, endpoint):
+        """
+        :return: (generator of dicts or NOT_MODIFIED, number of bytes announced)
+        """
+        url = "{0}{1}".format(self.seat_url, path)
+        entry = self.cache.get(url)
+        headers = dict(self.headers)
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        r = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        r.raise_for_status()
+        if r.status_code == 304 and entry is not None:
+            r.close()
+            return NOT_MODIFIED, 0
+        etag, last_modified = r.headers.get('ETag'), r.headers.get('Last-Modified')
+        if etag or last_modified:
+            chunks = r.iter_content(self.CHUNK_SIZE)
+            nbytes = int(r.headers.get('Content-Length', 0))
+            digest = None
+        else:
+            # without validators only the body tells whether anything changed, keep the raw bytes but not the objects
+            nbytes = len(r.content)
+            digest = hashlib.sha1(r.content).digest()
+            if entry is not None and entry.digest == digest:
+                return NOT_MODIFIED, nbytes
+            chunks = (r.content,)
+        return self._elements(r, url, chunks, endpoint, CacheEntry(etag, last_modified, digest)), nbytes
+
+    def _elements(self, r, url, chunks, endpoint, entry):
+        """
+        Generator over the array elements of a streamed response. The validators are only remembered once the
+        whole body was read, a body that breaks off counts as failure of the endpoint.
+        """
+        try:
+            yield from iter_array(chunks)
+        except (requests.exceptions.RequestException, ValueError):
+            self._record(endpoint, 0, failed=True)
+            self.breaker(endpoint).failure()
+            raise
+        finally:
+            r.close()
+        self.cache[url] = entry
+
+    def forget(self, path):
+        """
+        Drops the validators of a path, e.g. of a deleted tower, its next request fetches the full payload
+        :param path: str path below the api url
+        """
+        self.cache.pop("{0}{1}".format(self.seat_url, path), None)
+
+    def close(self):
+        if self.owns_session:
+            self.session.close()
+
+
+class CacheEntry:
+    __slots__ = ('etag', 'last_modified', 'digest')
+
+    def __init__(self, etag, last_modified, digest):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
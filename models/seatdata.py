@@ -1,87 +1,581 @@
+import copy
+import logging
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from models.breaker import RetryBudget
+from models.contentscache import ContentsCache
 from models.eveentities import Corp
-from models.starbases import Starbase, Module
+from models.indexes import Index, RangeIndex
+from models.seatapi import SeatSession, NOT_MODIFIED, STALE, http_session
+from models.starbases import Starbase, Module, Silo, NEW
 from models.pocos import Poco
+from models.scheduler import RefreshScheduler
+from models.stats import Stats
+
+log = logging.getLogger(__name__)
 
 
 class SeatData:
 
     STORAGE_KEY = 'seat_data'
+    # seconds of history the fuel rates and silo anomalies are computed from
+    RATE_WINDOW = 3 * 86400
 
-    def __init__(self, seat_token, seat_url):
-        self.seat_token = seat_token
-        self.seat_url = seat_url
+    def __init__(self, seat_token=None, seat_url=None, max_workers=8, timeout=30, contents_ttl=3600, storage=None,
+                 save_delay=10, silo_workers=4, refresh_interval=3600, retry_budget=10, history=None):
+        """
+        :param seat_token: SeAT api token of the default instance
+        :param seat_url: SeAT api url of the default instance, further instances are added with add_source
+        :param max_workers: int Maximum number of concurrent api requests
+        :param timeout: int Seconds to wait for a single api request
+        :param contents_ttl: int Seconds the module and silo contents of a tower are cached
+        :param storage: dict like persistent store, e.g. the plugin itself. Nothing is saved if None
+        :param save_delay: int Seconds without changes before dirty records are written to storage
+        :param silo_workers: int Maximum number of concurrent silo contents requests
+        :param refresh_interval: int Seconds between two updates of a corp's data in SeAT, see RefreshScheduler
+        :param retry_budget: int Retries of failed requests a single poll may spend
+        :param history: History object fuel and silo samples are recorded in, nothing is recorded if None
+        """
+        self.max_workers = max_workers
+        self.silo_workers = silo_workers
+        self.timeout = timeout
+        self.storage = storage
+        self.save_delay = save_delay
+        self.retry_budget = retry_budget
+        self.history = history
+        self._rates_outdated = True  # new tower samples since the fuel rates were computed
 
+        self.corps = {}  # corporationID -> Corp, shared by all starbases and pocos of the corp
+        self.corp_list = []  # Corp objects of all instances as of the last corp fetch
+        self.corp_lists = {}  # source name -> corp JSON list the instance returned last
         self.starbases = {}
         self.pocos = {}
+        self.refreshed_at = None  # unix timestamp of the last completed starbase fetch
+        self.generation = 0  # bumped on every change of starbases or pocos, see PageCache
+        self.starbase_changes = {}  # starbase id -> set of changes, consumed by the pos checks
+        self._changes_lock = threading.Lock()
+        # guards the records and their indexes, the corps of a fetch are ingested concurrently
+        self._store_lock = threading.RLock()
+        # one refresh at a time, the pollers, the initial refresh and the refetch commands may overlap
+        self._refresh_lock = threading.RLock()
+        self._crawl_lock = threading.Lock()  # held by the running pos contents crawl
+        self.contents = ContentsCache(contents_ttl)
+        self.stats = Stats()
+        self.scheduler = RefreshScheduler(refresh_interval)
+        # all instances share the connection pools, the scheduler and the worker pools
+        self.http = http_session(max_workers + silo_workers)
+        self.sources = {}  # source name -> SeatSession, in priority order
+        if seat_url:
+            self.add_source('', seat_token, seat_url)
+        self._build_indexes()
+
+        # persistence state, see trigger_save
+        self.snapshot = {'corps': {}, 'starbases': {}, 'pocos': {}}
+        self.dirty_starbases = set()
+        self.dirty_pocos = set()
+        self._last_change = 0
+        self._save_timer = None
+        self._save_lock = threading.Lock()
 
-    @property
-    def seat_headers(self):
-        return {'X-Token': self.seat_token, 'Accept': 'application/json'}
+    def _build_indexes(self):
+        """Creates the secondary indexes over starbases and pocos"""
+        self.starbases_by_system = Index(lambda starbase: starbase.solarsystem.casefold())
+        self.starbases_by_state = Index(lambda starbase: starbase.state)
+        self.starbases_by_corp = Index(lambda starbase: starbase.corp.corporationID)
+        self.starbases_without_stront = Index(lambda starbase: starbase.check_empty_stront())
+        self.starbases_by_fuel_expiry = RangeIndex(lambda starbase: starbase.fuel_expires)
+        self.starbases_by_stront_expiry = RangeIndex(lambda starbase: starbase.stront_expires)
+        self.starbases_by_update = RangeIndex(lambda starbase: starbase.updated)
+        self.pocos_by_system = Index(lambda poco: poco.solarsystem.casefold())
+        self.pocos_by_corp = Index(lambda poco: poco.corp.corporationID)
+        # 24 buckets, a reinforcement window query reads one bucket per hour
+        self.pocos_by_reinforce_hour = Index(lambda poco: int(poco.reinforceHour) % 24)
 
+    def _index_starbase(self, starbase):
+        for index in (self.starbases_by_system, self.starbases_by_state, self.starbases_by_corp,
+                      self.starbases_without_stront, self.starbases_by_fuel_expiry, self.starbases_by_stront_expiry,
+                      self.starbases_by_update):
+            index.add(starbase)
 
-    def trigger_save(self):
-        pass
+    def _unindex_starbase(self, starbaseid):
+        for index in (self.starbases_by_system, self.starbases_by_state, self.starbases_by_corp,
+                      self.starbases_without_stront, self.starbases_by_fuel_expiry, self.starbases_by_stront_expiry,
+                      self.starbases_by_update):
+            index.remove(starbaseid)
+
+    def _index_poco(self, poco):
+        self.pocos_by_system.add(poco)
+        self.pocos_by_corp.add(poco)
+        self.pocos_by_reinforce_hour.add(poco)
+
+    def _unindex_poco(self, pocoid):
+        for index in (self.pocos_by_system, self.pocos_by_corp, self.pocos_by_reinforce_hour):
+            index.remove(pocoid)
+
+    def add_source(self, name, seat_token, seat_url):
+        """
+        Adds a SeAT instance, its corps, starbases and pocos are merged with the ones of the other instances.
+        A corp listed by several instances is fetched from the one added first.
+        :param name: str name the records of the instance are tagged with, see Corp.source
+        :param seat_token: SeAT api token
+        :param seat_url: SeAT api url
+        """
+        self.sources[name] = SeatSession(seat_token, seat_url, self.timeout, self.max_workers + self.silo_workers,
+                                         self.stats, http=self.http, name=name)
+
+    ####################################################################################################################
+    # persistence
+    def trigger_save(self, *records):
+        """
+        Marks records as changed and schedules a save. Saves are debounced, the dirty records are written once no
+        change happened for save_delay seconds, so a full refresh results in a single write.
+        :param records: Starbase or Poco objects that changed
+        """
+        with self._save_lock:
+            for record in records:
+                if isinstance(record, Starbase):
+                    self.dirty_starbases.add(record.id)
+                else:
+                    self.dirty_pocos.add(record.id)
+            self._last_change = time.time()
+            if self.storage is not None and self._save_timer is None:
+                self._schedule_save(self.save_delay)
+
+    def _schedule_save(self, delay):
+        self._save_timer = threading.Timer(delay, self._debounced_save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _debounced_save(self):
+        with self._save_lock:
+            remaining = self._last_change + self.save_delay - time.time()
+            if remaining > 0 and self.storage is not None:
+                self._schedule_save(remaining)
+                return
+            self._save_timer = None
+        self.save()
+
+    def save(self):
+        """Writes all dirty records to storage"""
+        with self._save_lock:
+            if self.storage is None:
+                return
+            self._write_snapshot()
+
+    def close(self):
+        """
+        Cancels the pending save and writes the dirty records a last time.
+        Background refreshes and scans may still be running, their changes are no longer saved or recorded as the
+        storage and history are closed by their owner afterwards.
+        """
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self.storage is not None:
+                self._write_snapshot()
+            self.storage = None
+        self.history = None
+
+    def _write_snapshot(self):
+        starbaseids, self.dirty_starbases = self.dirty_starbases, set()
+        pocoids, self.dirty_pocos = self.dirty_pocos, set()
+        self._update_snapshot(self.snapshot['starbases'], self.starbases, starbaseids)
+        self._update_snapshot(self.snapshot['pocos'], self.pocos, pocoids)
+        self.snapshot['refreshed_at'] = self.refreshed_at
+        self.storage[self.STORAGE_KEY] = self.snapshot
+
+    def _update_snapshot(self, serialized, records, ids):
+        for id in ids:
+            record = records.get(id)
+            if record is None:
+                serialized.pop(id, None)
+            else:
+                self.snapshot['corps'][record.corp.corporationID] = (record.corp.ticker, record.corp.source)
+                serialized[id] = record.serialize()
+
+    def load(self, snapshot):
+        """
+        Restores starbases and pocos from a snapshot written by save
+        :param snapshot: dict
+        """
+        with self._store_lock:
+            corps = {}
+            for corpid, corp in snapshot['corps'].items():
+                # snapshots of a single instance stored the ticker only
+                ticker, source = (corp, '') if isinstance(corp, str) else corp
+                corps[corpid] = self.intern_corp({'corporationID': corpid, 'ticker': ticker}, source)
+            for data in snapshot['starbases'].values():
+                starbase = Starbase.deserialize(data, corps)
+                self.starbases[starbase.id] = starbase
+                self._index_starbase(starbase)
+                # evaluate every loaded starbase once, changes since the last check were not persisted
+                self._record_changes(starbase.id, NEW)
+            for data in snapshot['pocos'].values():
+                poco = Poco.deserialize(data, corps)
+                self.pocos[poco.id] = poco
+                self._index_poco(poco)
+            self.refreshed_at = snapshot.get('refreshed_at')
+            self.generation += 1
+            self.snapshot = snapshot
+        self.update_fuel_rates(time.time())
+
+    def data_age(self):
+        """
+        :return: float seconds since the starbase data was fetched from SeAT, None if it never was
+        """
+        if self.refreshed_at is None:
+            return None
+        return time.time() - self.refreshed_at
 
     ####################################################################################################################
     # poller functions
-    def fetch_starbases(self):
-        """Fetches all starbases"""
-        corplist = self._get_seat_all_corps()
-        for corp_json in corplist:
-            corp = Corp(corp_json)
-            starbaselist = self._get_seat_all_starbases(corp.corporationID)
-            for starbase_json in starbaselist:
-                self.add_starbase(Starbase(starbase_json, corp))
-
-    def fetch_pocos(self):
-        """Fetches all pocos"""
-        corplist = self._get_seat_all_corps()
-        for corp_json in corplist:
-            corp = Corp(corp_json)
-            pocolist = self._get_seat_all_pocos(corp.corporationID)
-            for poco_json in pocolist:
-                self.add_poco(Poco(poco_json, corp))
+    def refresh_due(self):
+        """Fetches the starbases and pocos of the corps the scheduler considers due"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            now = time.time()
+            corps = self.fetch_corps(RetryBudget(self.retry_budget))
+            starbase_corps = [corp for corp in corps if self.scheduler.is_due('starbases', corp.corporationID, now)]
+            poco_corps = [corp for corp in corps if self.scheduler.is_due('pocos', corp.corporationID, now)]
+            if starbase_corps:
+                self.fetch_starbases(starbase_corps)
+            if poco_corps:
+                self.fetch_pocos(poco_corps)
+            self.stats.record_poll('refresh_due', time.perf_counter() - start, len(starbase_corps) + len(poco_corps))
+
+    def fetch_corps(self, budget=None):
+        """
+        Fetches the corp lists of all instances, conditional so an unchanged list costs a 304
+        :param budget: RetryBudget of the poll
+        :return: list of Corp objects, the last known ones of an instance that is unavailable
+        """
+        names = list(self.sources)
+        results = self._fan_out(partial(self._get_seat_all_corps, if_changed=True, budget=budget), names)
+        for name, corplist in zip(names, results):
+            if corplist is not NOT_MODIFIED and corplist is not STALE:
+                self.corp_lists[name] = corplist
+        corps = {}
+        for name in names:
+            for corp_json in self.corp_lists.get(name, ()):
+                if corp_json['corporationID'] not in corps:
+                    corps[corp_json['corporationID']] = self.intern_corp(corp_json, name)
+        self.corp_list = list(corps.values())
+        return self.corp_list
+
+    def fetch_starbases(self, corps=None):
+        """
+        Fetches the starbases of corps and schedules their next fetch. Corps SeAT did not answer for keep their
+        starbases and stay due.
+        :param corps: list of Corp objects, all corps if None
+        :return: bool True if the starbases of every corp were fetched, False if some are stale
+        """
+        with self._refresh_lock:
+            start = time.perf_counter()
+            budget = RetryBudget(self.retry_budget)
+            corps = self.fetch_corps(budget) if corps is None else corps
+            # every worker reads and ingests its own response, so no more responses are open than connections pooled
+            results = self._fan_out(partial(self._fetch_corp, self._get_seat_all_starbases, self._ingest_starbases,
+                                            budget=budget), corps)
+            now = time.time()
+            stale = 0
+            for corp, fetched in zip(corps, results):
+                if not fetched:
+                    stale += 1
+                    continue
+                starbases = self.find_starbases_by_corp(corp.corporationID)
+                self.scheduler.schedule('starbases', corp.corporationID, now,
+                                        max((starbase.updated for starbase in starbases), default=None),
+                                        self._corp_stale(corp.corporationID))
+            if stale < len(corps):
+                self.refreshed_at = now
+            self.update_fuel_rates(now)
+            self.trigger_save()
+            self.stats.record_poll('fetch_starbases', time.perf_counter() - start, len(self.starbases))
+            if stale:
+                log.warning("Starbases of %s of %s corps are stale", stale, len(corps))
+            return not stale and bool(corps)
+
+    def _corp_stale(self, corpid):
+        """
+        :param corpid: int corporationID
+        :return: bool True if every tower of the corp is outdated, i.e. its api key stopped updating
+        """
+        starbases = self.find_starbases_by_corp(corpid)
+        return bool(starbases) and all(starbase.outdated for starbase in starbases)
+
+    def _fetch_corp(self, get, ingest, corp, budget=None):
+        """
+        Fetches the records of a corp and ingests them, runs on a fan out worker
+        :param get: function(corp, budget), _get_seat_all_starbases or _get_seat_all_pocos
+        :param ingest: function(corp, records), _ingest_starbases or _ingest_pocos
+        :param corp: Corp object
+        :param budget: RetryBudget of the poll
+        :return: bool False if SeAT did not answer or the stream broke off
+        """
+        records = get(corp, budget=budget)
+        if records is STALE:
+            return False
+        return records is NOT_MODIFIED or self._ingest(ingest, corp, records)
+
+    def _ingest(self, ingest, corp, records):
+        """
+        Runs ingest over a streamed record list
+        :param ingest: function(corp, records), _ingest_starbases or _ingest_pocos
+        :param corp: Corp object
+        :param records: iterable of JSON dicts
+        :return: bool False if the stream broke off, the records read so far are kept
+        """
+        try:
+            ingest(corp, records)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log.warning("SeAT data of %s broke off: %s", corp, e)
+            return False
+        return True
+
+    def _ingest_starbases(self, corp, starbaselist):
+        """
+        Stores the starbases of a corp whose api data differs from the stored ones and records what changed.
+        Unchanged starbases keep their objects, starbases no longer returned for the corp are deleted.
+        :param corp: Corp object
+        :param starbaselist: iterable of starbase JSON dicts, consumed once
+        """
+        seen = set()
+        samples = []
+        for starbase_json in starbaselist:
+            seen.add(starbase_json['itemID'])
+            old = self.starbases.get(starbase_json['itemID'])
+            if old is not None and old.fields() == tuple(starbase_json[key] for key in Starbase.FIELDS):
+                continue
+            starbase = Starbase(starbase_json, corp)
+            self._record_changes(starbase.id, starbase.changes(old))
+            self.add_starbase(starbase)
+            samples.append((starbase.id, starbase.updated, starbase.fuelBlocks, starbase.strontium))
+        for starbase in self.find_starbases_by_corp(corp.corporationID):
+            if starbase.id not in seen:
+                self.delete_starbase(starbase.id)
+        if self.history is not None and samples:
+            self.history.add_tower_samples(samples)
+            self._rates_outdated = True
+
+    def _record_changes(self, starbaseid, changes):
+        with self._changes_lock:
+            recorded = self.starbase_changes.get(starbaseid)
+            self.starbase_changes[starbaseid] = changes if recorded is None else recorded | changes
+
+    def pop_starbase_changes(self):
+        """
+        :return: dict starbase id -> frozenset of changes (see Starbase.changes) since the last call
+        """
+        with self._changes_lock:
+            changes, self.starbase_changes = self.starbase_changes, {}
+        return changes
+
+    def fetch_pocos(self, corps=None):
+        """
+        Fetches the pocos of corps and schedules their next fetch
+        :param corps: list of Corp objects, all corps if None
+        :return: bool True if the pocos of every corp were fetched, False if some are stale
+        """
+        with self._refresh_lock:
+            start = time.perf_counter()
+            budget = RetryBudget(self.retry_budget)
+            corps = self.fetch_corps(budget) if corps is None else corps
+            results = self._fan_out(partial(self._fetch_corp, self._get_seat_all_pocos, self._ingest_pocos,
+                                            budget=budget), corps)
+            now = time.time()
+            stale = 0
+            for corp, fetched in zip(corps, results):
+                if not fetched:
+                    stale += 1
+                    continue
+                # pocos carry no update time, they are refetched once per interval and share the key of the starbases
+                self.scheduler.schedule('pocos', corp.corporationID, now, stale=self._corp_stale(corp.corporationID))
+            self.stats.record_poll('fetch_pocos', time.perf_counter() - start, len(self.pocos))
+            if stale:
+                log.warning("Pocos of %s of %s corps are stale", stale, len(corps))
+            return not stale and bool(corps)
+
+    def _ingest_pocos(self, corp, pocolist):
+        """
+        Stores the pocos of a corp whose api data differs from the stored ones.
+        Pocos no longer returned for the corp are deleted.
+        :param corp: Corp object
+        :param pocolist: iterable of poco JSON dicts, consumed once
+        """
+        seen = set()
+        for poco_json in pocolist:
+            seen.add(poco_json['itemID'])
+            old = self.pocos.get(poco_json['itemID'])
+            if old is not None and old.fields() == tuple(poco_json[key] for key in Poco.FIELDS):
+                continue
+            self.add_poco(Poco(poco_json, corp))
+        for poco in self.find_pocos_by_corp(corp.corporationID):
+            if poco.id not in seen:
+                self.delete_poco(poco.id)
+
+    def intern_corp(self, corp_json, source=''):
+        """
+        :param corp_json: dict of corp data
+        :param source: str name of the instance the corp is fetched from
+        :return: the shared Corp object of the corporation
+        """
+        corp = self.corps.get(corp_json['corporationID'])
+        if corp is None:
+            corp = self.corps[corp_json['corporationID']] = Corp(corp_json, source)
+        else:
+            corp.ticker = corp_json['ticker']
+            corp.source = source
+        return corp
+
+    def refresh_pos_contents(self, starbases=None, on_tower=None):
+        """
+        Refetches modules and silo contents of every tower whose cached snapshot expired
+        :param starbases: list of Starbase objects to consider, all starbases if None
+        :param on_tower: function(starbase) called as soon as the contents of a tower are current, for towers a crawl
+                         running meanwhile refreshed too
+        """
+        # one crawl at a time, a later caller waits and only fetches what the running crawl left expired
+        with self._crawl_lock:
+            self._refresh_pos_contents(starbases, on_tower)
+
+    def _refresh_pos_contents(self, starbases, on_tower):
+        start = time.perf_counter()
+        now = time.time()
+        starbases = list(self.get_all_starbases()) if starbases is None else starbases
+        expired = []
+        for starbase in starbases:
+            if self.contents.is_expired(starbase.corp.corporationID, starbase.id, now):
+                expired.append(starbase)
+            elif on_tower is not None:
+                on_tower(starbase)
+        if not expired:
+            return
+
+        budget = RetryBudget(self.retry_budget)
+        samples = []
+        # silos of all towers share one pool so silo_workers bounds the silo requests in flight
+        with ThreadPoolExecutor(max_workers=self.silo_workers) as silo_pool:
+            def refresh(starbase):
+                modules = self._fetch_pos_contents(starbase, silo_pool, budget)
+                if modules is not None:
+                    self.contents.store(starbase.corp.corporationID, starbase.id, modules, now)
+                    samples.extend((module.itemID, int(now), starbase.id, module.quantity)
+                                   for module in modules if type(module) is Silo)
+                    if on_tower is not None:
+                        on_tower(starbase)
+
+            self._fan_out(refresh, expired)
+        if self.history is not None:
+            self.history.add_silo_samples(samples)
+            self.history.prune(now)
+        self.stats.record_poll('refresh_pos_contents', time.perf_counter() - start, len(expired))
+
+    def update_fuel_rates(self, now):
+        """
+        Projects the fuel of every tower with its consumption measured over RATE_WINDOW
+        :param now: float unix timestamp
+        """
+        if self.history is None or not self._rates_outdated:
+            return
+        self._rates_outdated = False
+        rates = self.history.fuel_rates(now - self.RATE_WINDOW)
+        with self._store_lock:
+            for starbaseid, rate in rates.items():
+                starbase = self.starbases.get(starbaseid)
+                if starbase is None or rate <= 0 or (starbase.fuel_rate and abs(rate - starbase.fuel_rate) < 0.01):
+                    continue
+                starbase.set_fuel_rate(rate)
+                self.starbases_by_fuel_expiry.add(starbase)
+                self.generation += 1
+
+    def find_siphon_anomalies(self, after=0):
+        """
+        Silos filling clearly slower than they usually do, see History.silo_anomalies
+        :param after: float only report silos sampled after this unix timestamp
+        :return: list of (Starbase, silo id, latest rate, usual rate), empty without history
+        """
+        if self.history is None:
+            return []
+        anomalies = self.history.silo_anomalies(time.time() - self.RATE_WINDOW, after)
+        return [(self.starbases[starbaseid], siloid, rate, mean) for siloid, starbaseid, rate, mean in anomalies
+                if starbaseid in self.starbases]
+
+    def circuit_states(self):
+        """
+        :return: dict endpoint -> state of its circuit breaker, only endpoints called so far
+        """
+        return {'%s/%s' % (name, endpoint) if name else endpoint: breaker.state
+                for name, session in self.sources.items() for endpoint, breaker in session.breakers.items()}
+
+    def _fan_out(self, call, args):
+        """
+        Runs call once per argument on a bounded thread pool
+        :param call: function taking a single argument
+        :param args: list of arguments
+        :return: list of results in the same order as args
+        """
+        if not args:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(args))) as executor:
+            return list(executor.map(call, args))
 
     ####################################################################################################################
     # Api Calls
-    def _get_seat_all_corps(self):
-        try:
-            r = requests.get("{0}/corporation/all".format(self.seat_url), headers=self.seat_headers)
-            return r.json()
-        except requests.exceptions.RequestException as e:
-            print(e)
+    def _get_seat_all_corps(self, source, if_changed=False, budget=None):
+        return self.sources[source].get("/corporation/all", if_changed, endpoint='corps', budget=budget)
 
-    def _get_seat_all_starbases(self, corpid: int):
-        try:
-            r = requests.get("{0}/corporation/starbases/{1}".format(self.seat_url, corpid),
-                             headers=self.seat_headers)
-            return r.json()
-        except requests.exceptions.RequestException as e:
-            print(e)
+    def _get_seat_all_starbases(self, corp, budget=None):
+        session = self.sources.get(corp.source)
+        if session is None:
+            return STALE
+        return session.stream_array("/corporation/starbases/{0}".format(corp.corporationID), endpoint='starbases',
+                                    budget=budget)
 
-    def _get_seat_all_pocos(self, corpid: int):
-        try:
-            r = requests.get("{0}/corporation/pocos/{1}".format(self.seat_url, corpid), headers=self.seat_headers)
-            return r.json()
-        except requests.exceptions.RequestException as e:
-            print(e)
+    def _get_seat_all_pocos(self, corp, budget=None):
+        session = self.sources.get(corp.source)
+        if session is None:
+            return STALE
+        return session.stream_array("/corporation/pocos/{0}".format(corp.corporationID), endpoint='pocos',
+                                    budget=budget)
 
-    def _get_seat_pos_contents(self, corpid, posid):
-        try:
-            r = requests.get("{0}/corporation/starbases/{1}/{2}".format(self.seat_url, corpid, posid),
-                             headers=self.seat_headers)
-            return r.json()
-        except requests.exceptions.RequestException as e:
-            print(e)
+    def _get_seat_pos_contents(self, corp, posid, if_changed=False, budget=None):
+        session = self.sources.get(corp.source)
+        if session is None:
+            return STALE
+        return session.get(self._pos_contents_path(corp, posid), if_changed, endpoint='pos_contents', budget=budget)
 
-    def _get_seat_silo_contents(self, corpid, siloid):
-        try:
-            r = requests.get("{0}/corporation/assets-contents/{1}/{2}".format(self.seat_url, corpid, siloid),
-                             headers=self.seat_headers)
-            return r.json()
-        except requests.exceptions.RequestException as e:
-            print(e)
+    def _get_seat_silo_contents(self, corp, siloid, if_changed=False, budget=None):
+        session = self.sources.get(corp.source)
+        if session is None:
+            return STALE
+        return session.get(self._silo_contents_path(corp, siloid), if_changed, endpoint='silo_contents',
+                           budget=budget)
+
+    @staticmethod
+    def _pos_contents_path(corp, posid):
+        return "/corporation/starbases/{0}/{1}".format(corp.corporationID, posid)
+
+    @staticmethod
+    def _silo_contents_path(corp, siloid):
+        return "/corporation/assets-contents/{0}/{1}".format(corp.corporationID, siloid)
+
+    def _forget_pos_contents(self, starbase, modules):
+        """
+        Drops the response validators of a tower and its silos, their next requests fetch the full payloads
+        :param starbase: Starbase object
+        :param modules: list of Module objects of the tower, None if unknown
+        """
+        session = self.sources.get(starbase.corp.source)
+        if session is None:
+            return
+        session.forget(self._pos_contents_path(starbase.corp, starbase.id))
+        for module in modules or []:
+            if type(module) is Silo:
+                session.forget(self._silo_contents_path(starbase.corp, module.itemID))
 
     ####################################################################################################################
     # Helpers
@@ -91,10 +585,13 @@ class SeatData:
         :param starbase: Starbase object
         :return:
         """
-        starbasetmp = self.starbases.get(starbase.id)
-        if starbasetmp is not None:
-            starbase.warn = starbasetmp.warn
-        self.store_starbase(starbase)
+        with self._store_lock:
+            starbasetmp = self.starbases.get(starbase.id)
+            if starbasetmp is not None:
+                starbase.warn = starbasetmp.warn
+                if starbasetmp.fuel_rate is not None:
+                    starbase.set_fuel_rate(starbasetmp.fuel_rate)
+            self.store_starbase(starbase)
 
     def store_starbase(self, starbase):
         """
@@ -102,15 +599,26 @@ class SeatData:
         :param starbase: Starbase object to save
         :return:
         """
-        self.starbases[starbase.id] = starbase
-        self.trigger_save()
+        with self._store_lock:
+            self.starbases[starbase.id] = starbase
+            self._index_starbase(starbase)
+            self.generation += 1
+        self.trigger_save(starbase)
 
     def delete_starbase(self, starbaseid):
-        del self.starbases[starbaseid]
-        self.trigger_save()
+        with self._store_lock:
+            starbase = self.starbases.pop(starbaseid, None)
+            if starbase is None:
+                return
+            self._unindex_starbase(starbaseid)
+            self.generation += 1
+        self._forget_pos_contents(starbase, self.contents.get(starbase.corp.corporationID, starbaseid))
+        self.contents.drop(starbase.corp.corporationID, starbaseid)
+        self.trigger_save(starbase)
 
     def get_all_starbases(self):
-        return self.starbases.values()
+        with self._store_lock:
+            return list(self.starbases.values())
 
     def get_starbase_by_id(self, id: int):
         try:
@@ -122,15 +630,144 @@ class SeatData:
         self.store_poco(poco)
 
     def store_poco(self, poco):
-        self.pocos[poco.id] = poco
-        self.trigger_save()
+        with self._store_lock:
+            self.pocos[poco.id] = poco
+            self._index_poco(poco)
+            self.generation += 1
+        self.trigger_save(poco)
+
+    def delete_poco(self, pocoid):
+        with self._store_lock:
+            poco = self.pocos.pop(pocoid, None)
+            if poco is None:
+                return
+            self._unindex_poco(pocoid)
+            self.generation += 1
+        self.trigger_save(poco)
 
     def get_all_pocos(self):
-        return self.pocos.values()
-
-    def get_pos_contents(self, corp_id, starbase):
-        contents_json = self._get_seat_pos_contents(corp_id, starbase.id)
-        modules = []
-        for module in contents_json['modules']:
-            # TODO: use a factory and abstract types
-            module = Module(module['detail'])
+        with self._store_lock:
+            return list(self.pocos.values())
+
+    def find_starbases_by_system(self, system):
+        with self._store_lock:
+            return self.starbases_by_system.get(system.casefold())
+
+    def find_starbases_by_state(self, *states):
+        with self._store_lock:
+            return [starbase for state in states for starbase in self.starbases_by_state.get(state)]
+
+    def find_starbases_by_corp(self, corpid):
+        with self._store_lock:
+            return self.starbases_by_corp.get(corpid)
+
+    def find_starbases_without_stront(self):
+        with self._store_lock:
+            return self.starbases_without_stront.get(True)
+
+    def find_starbases_fuel_expiring(self, start, end):
+        """
+        :param start: float unix timestamp
+        :param end: float unix timestamp
+        :return: list of starbases running out of fuel in [start, end), soonest first
+        """
+        with self._store_lock:
+            return self.starbases_by_fuel_expiry.range(start, end)
+
+    def find_starbases_stront_expiring(self, start, end):
+        """
+        :param start: float unix timestamp
+        :param end: float unix timestamp
+        :return: list of starbases running out of strontium in [start, end), soonest first
+        """
+        with self._store_lock:
+            return self.starbases_by_stront_expiry.range(start, end)
+
+    def find_outdated_starbases(self, now):
+        """
+        :param now: float unix timestamp
+        :return: list of starbases whose api data is older than 12 hours
+        """
+        with self._store_lock:
+            return self.starbases_by_update.range(0, now - 12 * 3600)
+
+    def next_fuel_warning(self, threshold, now):
+        """
+        :param threshold: int Hours of fuel left to alert on
+        :param now: float unix timestamp
+        :return: float unix timestamp at which the next tower drops below the threshold, None if no tower will
+        """
+        with self._store_lock:
+            starbase = self.starbases_by_fuel_expiry.first_after(now + threshold * 3600)
+            if starbase is None:
+                return None
+            return starbase.fuel_expires - threshold * 3600
+
+    def find_pocos_by_system(self, system):
+        with self._store_lock:
+            return self.pocos_by_system.get(system.casefold())
+
+    def find_pocos_by_corp(self, corpid):
+        with self._store_lock:
+            return self.pocos_by_corp.get(corpid)
+
+    def find_pocos_by_reinforce_window(self, start, end):
+        """
+        :param start: int first reinforce hour of the window, 0-23
+        :param end: int last reinforce hour of the window, included, the window wraps past midnight if end < start
+        :return: list of Poco objects ordered by reinforce hour from start on
+        """
+        with self._store_lock:
+            pocos = []
+            for hour in range(start, start + (end - start) % 24 + 1):
+                pocos.extend(self.pocos_by_reinforce_hour.get(hour % 24))
+            return pocos
+
+    def get_pos_modules(self, starbase):
+        """
+        Modules of a tower from the cached snapshot, does not call the api
+        :param starbase: Starbase object
+        :return: list of Module objects, None if the contents were not fetched yet
+        """
+        return self.contents.get(starbase.corp.corporationID, starbase.id)
+
+    def _fetch_pos_contents(self, starbase, silo_pool, budget=None):
+        """
+        Fetches the modules of a tower including the contents of its silos
+        :param starbase: Starbase object
+        :param silo_pool: Executor the silo contents are fetched on
+        :param budget: RetryBudget of the poll
+        :return: list of Module objects, None if an api call failed, the tower then keeps its cached contents
+        """
+        # unchanged payloads are not decoded again, the cached modules are copied instead. Only what the cache
+        # holds is requested conditionally, the session keeps the validators but not the payloads
+        cached = self.contents.get(starbase.corp.corporationID, starbase.id)
+        contents_json = self._get_seat_pos_contents(starbase.corp, starbase.id, cached is not None, budget)
+        if contents_json is STALE:
+            return None
+        if contents_json is NOT_MODIFIED:
+            modules = [copy.copy(module) for module in cached]
+        else:
+            modules = [Module.factory(module_json) for module_json in contents_json['modules']]
+        known = {module.itemID: module for module in cached or [] if type(module) is Silo}
+        silos = []
+        for module in modules:
+            if type(module) is not Silo:
+                continue
+            old = known.get(module.itemID)
+            if old is not None:
+                module.quantity = old.quantity
+            silos.append((module, silo_pool.submit(self._get_seat_silo_contents, starbase.corp, module.itemID,
+                                                   old is not None, budget)))
+        results = [(silo, contents.result()) for silo, contents in silos]
+        if any(contents is STALE for silo, contents in results):
+            # the validators of the requests that succeeded describe contents that are not stored
+            self._forget_pos_contents(starbase, modules)
+            return None
+        for silo, contents in results:
+            if contents is not NOT_MODIFIED:
+                silo.set_contents(contents)
+        session = self.sources.get(starbase.corp.source)
+        for siloid in set(known) - {silo.itemID for silo, _ in results}:
+            session.forget(self._silo_contents_path(starbase.corp, siloid))
+        return modules
@@ -0,0 +1,109 @@
+import logging
+import threading
+from models.starbases import Silo
+
+log = logging.getLogger(__name__)
+
+
+class SiphonScan:
+    """
+    Background scan of all silos and coupling arrays for siphons.
+    Refreshes expired pos contents and streams progress and findings to every attached subscriber.
+    """
+
+    def __init__(self, seat_data, notify, report, progress_steps=4):
+        """
+        :param seat_data: SeatData object
+        :param notify: function(subscriber, text) queueing a message to a subscriber, it is not sent right away so a
+                       scan finding many siphons does not flood the chat backend
+        :param report: function(starbase) called for every tower with a possible siphon
+        :param progress_steps: int Number of progress messages sent during the scan
+        """
+        self.seat_data = seat_data
+        self.notify = notify
+        self.report = report
+        self.progress_steps = progress_steps
+        self.subscribers = []
+        self.siphons = []  # starbases with a possible siphon
+        self.checked = 0
+        self.total = 0
+        self.anomalies = set()  # starbase ids with a silo filling slower than usual
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name='seat-siphon-scan', daemon=True).start()
+
+    def attach(self, subscriber):
+        """
+        Adds a subscriber to the running scan and tells it what was found so far
+        :return: bool False if the scan already finished
+        """
+        with self._lock:
+            if self.finished:
+                return False
+            self.subscribers.append(subscriber)
+            found = list(self.siphons)
+            checked, total = self.checked, self.total
+        if total:
+            self.notify(subscriber, "Siphon scan is running, %s/%s towers checked." % (checked, total))
+        for starbase in found:
+            self.notify(subscriber, self._describe(starbase))
+        return True
+
+    def _run(self):
+        starbases = list(self.seat_data.get_all_starbases())
+        self.total = len(starbases)
+        failed = False
+        try:
+            self.anomalies = {starbase.id for starbase, *_ in self.seat_data.find_siphon_anomalies()}
+            expired = []
+            for starbase in starbases:
+                if self.seat_data.contents.is_expired(starbase.corp.corporationID, starbase.id):
+                    expired.append(starbase)
+                else:
+                    self._check(starbase)
+            self.seat_data.refresh_pos_contents(expired, on_tower=self._check)
+        except Exception:
+            log.exception("Siphon scan failed")
+            failed = True
+        finally:
+            with self._lock:
+                self.finished = True
+                subscribers = list(self.subscribers)
+        if failed:
+            summary = "Siphon scan failed after %s/%s towers, %s possible siphons found so far." % (
+                self.checked, self.total, len(self.siphons))
+        elif self.checked < self.total:
+            # towers whose contents could not be fetched are never checked, e.g. while SeAT is down
+            summary = "Siphon scan incomplete, the contents of %s/%s towers could not be fetched, %s possible " \
+                      "siphons found in the others." % (self.total - self.checked, self.total, len(self.siphons))
+        elif self.siphons:
+            summary = "Siphon scan done, %s possible siphons in %s towers." % (len(self.siphons), self.total)
+        else:
+            summary = "Did not find any siphons."
+        for subscriber in subscribers:
+            self.notify(subscriber, summary)
+
+    def _check(self, starbase):
+        siphon = starbase.id in self.anomalies or any(type(module) is Silo and module.has_siphon()
+                                                      for module in self.seat_data.get_pos_modules(starbase) or [])
+        with self._lock:
+            self.checked += 1
+            checked = self.checked
+            step = max(self.total // (self.progress_steps + 1), 1)
+            progress = self.checked % step == 0 and self.checked < self.total
+            if siphon:
+                self.siphons.append(starbase)
+            subscribers = list(self.subscribers)
+        if siphon:
+            self.report(starbase)
+        for subscriber in subscribers:
+            if siphon:
+                self.notify(subscriber, self._describe(starbase))
+            if progress:
+                self.notify(subscriber, "%s/%s towers checked." % (checked, self.total))
+
+    @staticmethod
+    def _describe(starbase):
+        return "Possible siphon detected: %s - %s - %s" % (starbase.moon, starbase.type, starbase.corp)
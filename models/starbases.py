@@ -1,7 +1,16 @@
+import calendar
 import datetime
+import sys
+import time
+
+# shared change set of new starbases, see Starbase.changes
+NEW = frozenset(['new'])
 
 
 class Starbase:
+    __slots__ = ('id', 'corp', 'name', 'type', 'updated_at', 'onAggression', 'solarsystem', 'moon', 'baseFuelUsage',
+                 'fuelBaySize', 'fuelBlocks', 'baseStrontUsage', 'strontBaySize', 'strontium', 'state',
+                 'stateTimeStamp', 'warn', 'updated', 'fuel_rate', 'fuel_expires', 'stront_expires')
 
     STATE_UNANCHORED = 0
     STATE_ANCHORED = 1
@@ -9,6 +18,11 @@ class Starbase:
     STATE_REINFORCED = 3
     STATE_ONLINE = 4
 
+    # JSON keys in the order of the serialized form
+    FIELDS = ('itemID', 'starbaseName', 'starbaseTypeName', 'updated_at', 'onAggression', 'solarSystemName',
+              'moonName', 'baseFuelUsage', 'fuelBaySize', 'fuelBlocks', 'baseStrontUsage', 'strontBaySize',
+              'strontium', 'state', 'stateTimeStamp')
+
     def __init__(self, starbase, corp):
         """
         :param starbase: dict JSON
@@ -17,10 +31,11 @@ class Starbase:
         self.id = starbase['itemID']
         self.corp = corp
         self.name = starbase['starbaseName']
-        self.type = starbase['starbaseTypeName']
+        # type and system names repeat across the fleet, share one string object each
+        self.type = sys.intern(starbase['starbaseTypeName'])
         self.updated_at = starbase['updated_at']
         self.onAggression = starbase['onAggression']
-        self.solarsystem = starbase['solarSystemName']
+        self.solarsystem = sys.intern(starbase['solarSystemName'])
         self.moon = starbase['moonName']
         self.baseFuelUsage = starbase['baseFuelUsage']
         self.fuelBaySize = starbase['fuelBaySize']
@@ -31,17 +46,86 @@ class Starbase:
         self.state = starbase['state']
         self.stateTimeStamp = starbase['stateTimeStamp']
         self.warn = StarbaseWarn()  # Allows us to easily swap this out if the starbase exists
-        self.outdated = False
 
-        # check if data is outdated
+        # unix timestamp of the last api update
         postime = datetime.datetime.strptime(self.updated_at, "%Y-%m-%d %H:%M:%S")
-        if postime < datetime.datetime.utcnow() - datetime.timedelta(hours=12):
-            self.outdated = True
+        self.updated = calendar.timegm(postime.timetuple())
+
+        # measured fuel blocks per hour, see set_fuel_rate
+        self.fuel_rate = None
+
+        # projected unix timestamps at which fuel and stront run out, counted from the last api update
+        self.fuel_expires = self.updated + self.pos_fuel_hours_left() * 3600
+        self.stront_expires = self.updated + self.pos_stront_hours_left() * 3600
+
+    @property
+    def outdated(self):
+        """True if the api data is older than 12 hours"""
+        return self.updated < time.time() - 12 * 3600
+
+    def fields(self):
+        """
+        :return: tuple of the FIELDS values, equal tuples mean equal api data
+        """
+        return (self.id, self.name, self.type, self.updated_at, self.onAggression, self.solarsystem, self.moon,
+                self.baseFuelUsage, self.fuelBaySize, self.fuelBlocks, self.baseStrontUsage, self.strontBaySize,
+                self.strontium, self.state, self.stateTimeStamp)
+
+    def changes(self, other):
+        """
+        Compares this starbase with an older version of itself
+        :param other: Starbase object, None if the starbase is new
+        :return: frozenset of changed aspects out of 'new', 'fuel', 'stront', 'state', 'updated'
+        """
+        if other is None:
+            return NEW
+        changes = set()
+        if self.fuelBlocks != other.fuelBlocks:
+            changes.add('fuel')
+        if self.strontium != other.strontium:
+            changes.add('stront')
+        if self.state != other.state:
+            changes.add('state')
+        if self.updated_at != other.updated_at:
+            changes.add('updated')
+        return frozenset(changes)
+
+    def serialize(self):
+        """
+        :return: tuple (corporationID, FIELDS values..., warn flags)
+        """
+        return (self.corp.corporationID,) + self.fields() + (self.warn.serialize(),)
+
+    @classmethod
+    def deserialize(cls, data, corps):
+        """
+        :param data: tuple as returned by serialize
+        :param corps: dict corporationID -> Corp object
+        :return: Starbase object
+        """
+        starbase = cls(dict(zip(cls.FIELDS, data[1:-1])), corps[data[0]])
+        starbase.warn = StarbaseWarn.deserialize(data[-1])
+        return starbase
 
     def pos_fuel_hours_left(self):
-        hours_left = self.fuelBlocks / self.baseFuelUsage
+        hours_left = self.fuelBlocks / (self.fuel_rate or self.baseFuelUsage)
         return hours_left
 
+    def set_fuel_rate(self, rate):
+        """
+        Projects fuel with the measured consumption instead of baseFuelUsage, e.g. for sovereignty discounts
+        :param rate: float fuel blocks per hour, None to use baseFuelUsage
+        """
+        self.fuel_rate = rate
+        self.fuel_expires = self.updated + self.pos_fuel_hours_left() * 3600
+
+    def projected_fuel_hours_left(self, now):
+        """
+        :param now: float unix timestamp
+        :return: float hours of fuel left at the given time
+        """
+        return max(self.fuel_expires - now, 0) / 3600
+
     def pos_stront_hours_left(self):
         hours_left = self.strontium / self.baseStrontUsage
         return hours_left
@@ -77,17 +161,36 @@ class Starbase:
 
 
 class StarbaseWarn:
+    __slots__ = ('fuel', 'full', 'reinf', 'stront')
+
     def __init__(self):
         self.fuel = True
         self.full = True
         self.reinf = True
         self.stront = True
 
+    def serialize(self):
+        """
+        :return: int bit flags fuel=1, full=2, reinf=4, stront=8
+        """
+        return self.fuel | self.full << 1 | self.reinf << 2 | self.stront << 3
+
+    @classmethod
+    def deserialize(cls, flags):
+        warn = cls()
+        warn.fuel = bool(flags & 1)
+        warn.full = bool(flags & 2)
+        warn.reinf = bool(flags & 4)
+        warn.stront = bool(flags & 8)
+        return warn
+
 
 class Module:
     """
     Any POS modules
     """
+    __slots__ = ('typeID', 'itemID', 'capacity')
+
     def __init__(self, module):
         self.typeID = module['typeID']
         self.itemID = module['itemID']
@@ -97,21 +200,24 @@ class Module:
     def factory(cls, module):
         if module['detail']['typeID'] == 14343 or module['detail']['typeID'] == 17982:
             # Silo/CouplingArray
-            return Silo(module)
+            return Silo(module['detail'])
         else:
-            return Module(module)
+            return Module(module['detail'])
 
 
 class Silo(Module):
     """
     Silo or CouplingArray
     """
+    __slots__ = ('quantity',)
+
     def __init__(self, module):
         super().__init__(module)
         self.quantity = 0
 
     def set_contents(self, contents):
-        self.quantity = contents[0]['quantity']
+        # an empty silo has no contents at all
+        self.quantity = contents[0]['quantity'] if contents else 0
 
     def silo_full(self):
         return self.quantity >= self.capacity
@@ -0,0 +1,132 @@
+import bisect
+import math
+import threading
+import time
+
+
+class EndpointStats:
+    # upper bounds in seconds of the latency histogram buckets
+    BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, math.inf)
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.histogram = [0] * len(self.BUCKETS)
+
+    def percentile(self, fraction):
+        """
+        :param fraction: float between 0 and 1
+        :return: float upper bound of the bucket holding the percentile, None without calls
+        """
+        target = math.ceil(self.calls * fraction)
+        seen = 0
+        for bound, count in zip(self.BUCKETS, self.histogram):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return None
+
+    def snapshot(self):
+        return {'calls': self.calls, 'failures': self.failures, 'rejected': self.rejected,
+                'not_modified': self.not_modified,
+                'bytes': self.bytes, 'seconds': self.seconds,
+                'histogram': dict(zip((str(bound) for bound in self.BUCKETS), self.histogram))}
+
+
+class PollerStats:
+    def __init__(self):
+        self.runs = 0
+        self.seconds = 0.0
+        self.last_seconds = 0.0
+        self.last_run = None
+        self.evaluated = 0
+        self.alerts = 0
+
+    def snapshot(self):
+        return {'runs': self.runs, 'seconds': self.seconds, 'last_seconds': self.last_seconds,
+                'last_run': self.last_run, 'evaluated': self.evaluated, 'alerts': self.alerts}
+
+
+class Stats:
+    """
+    Counters and latency histograms of the SeAT api calls and the pollers.
+    Recording is a few additions under a lock, cheap enough to stay enabled.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = {}  # endpoint name -> EndpointStats
+        self.pollers = {}  # poller name -> PollerStats
+        self._lock = threading.Lock()
+
+    def record_request(self, endpoint, seconds, nbytes=0, failed=False, not_modified=False, rejected=False):
+        """
+        :param endpoint: str endpoint name, e.g. starbases
+        :param seconds: float duration of the request
+        :param nbytes: int size of the response body
+        :param failed: bool True if the request raised
+        :param not_modified: bool True if the payload did not change since the last request
+        :param rejected: bool True if the request was not made because the circuit of the endpoint is open
+        """
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            if rejected:
+                stats.rejected += 1
+                return
+            stats.calls += 1
+            stats.failures += failed
+            stats.not_modified += not_modified
+            stats.bytes += nbytes
+            stats.seconds += seconds
+            stats.histogram[bisect.bisect_left(EndpointStats.BUCKETS, seconds)] += 1
+
+    def record_poll(self, poller, seconds, evaluated=0, alerts=0):
+        """
+        :param poller: str poller name
+        :param seconds: float duration of the run
+        :param evaluated: int number of towers or pocos evaluated
+        :param alerts: int number of alerts queued
+        """
+        with self._lock:
+            stats = self.pollers.get(poller)
+            if stats is None:
+                stats = self.pollers[poller] = PollerStats()
+            stats.runs += 1
+            stats.seconds += seconds
+            stats.last_seconds = seconds
+            stats.last_run = time.time()
+            stats.evaluated += evaluated
+            stats.alerts += alerts
+
+    def snapshot(self):
+        """
+        :return: dict of all metrics, JSON serializable
+        """
+        with self._lock:
+            return {'started': self.started,
+                    'endpoints': {name: stats.snapshot() for name, stats in self.endpoints.items()},
+                    'pollers': {name: stats.snapshot() for name, stats in self.pollers.items()}}
+
+    def render(self):
+        """
+        :return: str human readable summary
+        """
+        lines = ['**SeAT api** (since %s)' % time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(self.started))]
+        with self._lock:
+            for name, stats in sorted(self.endpoints.items()):
+                lines.append('%s: %s calls, %s failed, %s rejected, %s unchanged, %.1f KiB, avg %.0fms, p50 <= %ss, '
+                             'p95 <= %ss' % (name, stats.calls, stats.failures, stats.rejected, stats.not_modified,
+                                             stats.bytes / 1024, stats.seconds / max(stats.calls, 1) * 1000,
+                                             stats.percentile(0.5), stats.percentile(0.95)))
+            lines.append('**Pollers**')
+            for name, stats in sorted(self.pollers.items()):
+                lines.append('%s: %s runs, last %.0fms, avg %.0fms, %s evaluated, %s alerts' % (
+                    name, stats.runs, stats.last_seconds * 1000, stats.seconds / stats.runs * 1000,
+                    stats.evaluated, stats.alerts))
+        return '\n'.join(lines)
@@ -1,30 +1,86 @@
+import json
+import os
+import sqlite3
+import threading
+import time
 from errbot import BotPlugin, botcmd, cmdfilter
+from errbot.botplugin import recurse_check_structure
+from models.fuelplan import FuelPlan
+from models.history import History
+from models.jumpgraph import JumpGraph
+from models.outbox import Outbox
+from models.pagecache import PageCache, paginate
 from models.seatdata import SeatData
-from models.starbases import Module, Silo, Starbase
+from models.siphonscan import SiphonScan
+from models.starbases import Silo, Starbase
 
 
 class Seat(BotPlugin):
     """Seat API to errbot interface"""
 
+    # set by activate, which fails before the plugin is configured; deactivate is called anyway
+    seat_data = None
+    outbox = None
+    history = None
+    fuel_timer = None
+
     def activate(self):
+        activate_start = time.time()
         super(Seat, self).activate()
-        # populate all data at startup
-        if SeatData.STORAGE_KEY in self:
-            # Loading existing data
-            self.seat_data = self[SeatData.STORAGE_KEY]
-        else:
-            # New/initial data structure
-            self.seat_data = SeatData(self.config['SEAT_TOKEN'], self.config['SEAT_URL'])
-
-        self.seat_data.fetch_starbases()
-        self.seat_data.fetch_pocos()
+        self.fuel_timer = None
+        self.fuel_checked_until = 0
+        self.siphon_scan = None
+        self.siphon_scan_lock = threading.Lock()
+        self.anomalies_checked_until = time.time()
+        history_path = self.config.get('SEAT_HISTORY', os.path.join(self.bot_config.BOT_DATA_DIR, 'seat_history.db'))
+        self.history = None
+        if history_path:
+            try:
+                self.history = History(history_path)
+            except sqlite3.Error as e:
+                # run without history rather than not at all
+                self.log.error("Seat history disabled, can not open %s: %s", history_path, e)
+        jumps_path = self.config.get('SEAT_JUMPS', '')
+        self.jumps = None
+        if jumps_path:
+            try:
+                self.jumps = JumpGraph.load(jumps_path)
+            except (OSError, ValueError, KeyError) as e:
+                # KeyError: a header without the system name columns
+                self.log.error("Seat near commands disabled, can not load jump data %s: %r", jumps_path, e)
+        self.message_length = int(self.config.get('SEAT_MESSAGE_LENGTH', 1900))
+        self.pages = PageCache()
+        self.outbox = Outbox(self._send_to_channel, rate=float(self.config.get('SEAT_MESSAGES_PER_SECOND', 1)),
+                             max_length=self.message_length)
+        self.seat_data = SeatData(self.config.get('SEAT_TOKEN'), self.config.get('SEAT_URL'),
+                                  max_workers=int(self.config.get('SEAT_WORKERS', 8)),
+                                  silo_workers=int(self.config.get('SEAT_SILO_WORKERS', 4)),
+                                  timeout=int(self.config.get('SEAT_TIMEOUT', 30)),
+                                  contents_ttl=int(self.config.get('SEAT_CONTENTS_TTL', 3600)),
+                                  refresh_interval=int(self.config.get('SEAT_REFRESH_INTERVAL', 3600)),
+                                  history=self.history, storage=self)
+        # further SeAT instances, a corp listed by several of them is fetched from the first one
+        for instance in self.config.get('SEAT_INSTANCES', []):
+            self.seat_data.add_source(instance['NAME'], instance['SEAT_TOKEN'], instance['SEAT_URL'])
+        # serve commands from the last snapshot right away, silenced warnings survive restarts
+        if SeatData.STORAGE_KEY in self and isinstance(self[SeatData.STORAGE_KEY], dict):
+            self.seat_data.load(self[SeatData.STORAGE_KEY])
+        age = self.seat_data.data_age()
+        self.log.info("Seat ready after %.0fms with %s starbases and %s pocos, data age %s",
+                      (time.time() - activate_start) * 1000, len(self.seat_data.starbases),
+                      len(self.seat_data.pocos), "%.0fs" % age if age is not None else "unknown")
+
+        # populate all data in the background so a slow or unreachable SeAT does not block the bot
+        threading.Thread(target=self._initial_refresh, args=(activate_start,), name='seat-initial-refresh',
+                         daemon=True).start()
+        # only the corps whose data is due are fetched, see RefreshScheduler
         self.start_poller(
-            1800,
-            self.seat_data.fetch_starbases()
+            60,
+            self.seat_data.refresh_due
         )
         self.start_poller(
-            1800,
-            self.seat_data.fetch_pocos()
+            600,
+            self.seat_data.refresh_pos_contents
         )
         self.start_poller(
             3600,
@@ -35,185 +91,482 @@ class Seat(BotPlugin):
             self._poller_check_pos_modules
         )
 
+    def deactivate(self):
+        if self.fuel_timer is not None:
+            self.fuel_timer.cancel()
+        if self.seat_data is not None:
+            # the initial refresh or a siphon scan may outlive the plugin, they must not write to the closed storage
+            self.seat_data.close()
+        if self.outbox is not None:
+            self.outbox.stop()
+        if self.history is not None:
+            self.history.close()
+        super(Seat, self).deactivate()
+
     ####################################################################################################################
     # Configuration
+    # keys that may be left out of the configuration, the ones without a default here get theirs in activate
+    CONFIG_DEFAULTS = {'SEAT_WORKERS': '8', 'SEAT_TIMEOUT': '30', 'SEAT_CONTENTS_TTL': '3600',
+                       'SEAT_MESSAGES_PER_SECOND': '1', 'SEAT_SILO_WORKERS': '4', 'SEAT_REFRESH_INTERVAL': '3600',
+                       'SEAT_MESSAGE_LENGTH': '1900', 'SEAT_INSTANCES': []}
+    OPTIONAL_KEYS = set(CONFIG_DEFAULTS) | {'SEAT_HISTORY', 'SEAT_JUMPS'}
+
+    def check_configuration(self, configuration):
+        """Like the default check, but the OPTIONAL_KEYS may be missing"""
+        template = self.get_configuration_template()
+        recurse_check_structure(template, dict({key: template[key] for key in self.OPTIONAL_KEYS}, **configuration))
+
+    def configure(self, configuration):
+        if configuration is not None:
+            configuration = dict(self.CONFIG_DEFAULTS, **configuration)
+        super(Seat, self).configure(configuration)
+
     def get_configuration_template(self):
         return {'SEAT_TOKEN': '<your_seat_token>', 'SEAT_URL': '<your_seat_url>', 'FUEL_THRESHOLD': '12',
-                'REPORT_POS_CHAN': '<yourchannel>', 'REPORT_REINF_CHAN': '<yourchannel>'}
+                'REPORT_POS_CHAN': '<yourchannel>', 'REPORT_REINF_CHAN': '<yourchannel>', 'SEAT_WORKERS': '8',
+                'SEAT_TIMEOUT': '30', 'SEAT_CONTENTS_TTL': '3600',
+                'SEAT_MESSAGES_PER_SECOND': '1', 'SEAT_SILO_WORKERS': '4', 'SEAT_REFRESH_INTERVAL': '3600',
+                'SEAT_HISTORY': '<data dir>/seat_history.db', 'SEAT_MESSAGE_LENGTH': '1900',
+                'SEAT_JUMPS': '<path to jumps.csv>',
+                'SEAT_INSTANCES': [{'NAME': '<name>', 'SEAT_URL': '<your_seat_url>',
+                                    'SEAT_TOKEN': '<your_seat_token>'}]}
 
     ####################################################################################################################
     # Helpers
+    def _send_to_channel(self, channel, text):
+        self.send(self.build_identifier(channel), text)
+
+    @staticmethod
+    def _paging_options(args):
+        """
+        Splits the paging options off command arguments
+        :param args: str command arguments, e.g. 'Jita --page 2 --limit 50'
+        :return: (str remaining arguments, int page or None for all pages, int row limit or None),
+                 the remaining arguments are None if an option is invalid
+        """
+        words = args.split()
+        options = {'--page': None, '--limit': None}
+        for option in options:
+            if option in words:
+                i = words.index(option)
+                value = words[i + 1] if i + 1 < len(words) else ''
+                if not value.isdigit() or int(value) < 1:
+                    return None, None, None
+                options[option] = int(value)
+                del words[i:i + 2]
+        return " ".join(words), options['--page'], options['--limit']
+
+    @staticmethod
+    def _starbase_line(starbase):
+        return "**Location:** %s **Type:** %s **Corp:** %s **Name:** %s" % (
+            starbase.moon, starbase.type, starbase.corp, starbase.name)
+
+    @staticmethod
+    def _result_lines(rows, limit, empty, total):
+        """
+        :param rows: list of str result rows
+        :param limit: int Maximum number of rows shown, None for all
+        :param empty: str line shown if there are no rows
+        :param total: str format of the summary line, gets the number of rows
+        :return: list of str lines of the whole result
+        """
+        if not rows:
+            return [empty]
+        summary = total % len(rows)
+        if limit is not None and limit < len(rows):
+            summary += " Showing the first %s." % limit
+            rows = rows[:limit]
+        return rows + [summary]
+
+    def _pages(self, key, page, render):
+        """
+        Yields a command result as few messages under the backend size limit, rendered once per data generation
+        :param key: tuple of command and the arguments the result depends on
+        :param page: int Page to send, all pages if None
+        :param render: function() -> list of str lines of the whole result
+        """
+        # room for the page footer
+        pages = self.pages.get(key, self.seat_data.generation, time.time(),
+                               lambda: paginate(render(), self.message_length - 32))
+        if page is not None and page > len(pages):
+            yield "There %s only %s page%s." % (
+                "is" if len(pages) == 1 else "are", len(pages), "" if len(pages) == 1 else "s")
+            return
+        for number in [page] if page is not None else range(1, len(pages) + 1):
+            if len(pages) == 1:
+                yield pages[0]
+            else:
+                yield "%s\n(page %s of %s)" % (pages[number - 1], number, len(pages))
+
+    def _initial_refresh(self, activate_start):
+        """First full fetch after activation, runs in its own thread"""
+        try:
+            self.seat_data.fetch_starbases()
+            self.seat_data.fetch_pocos()
+            self.log.info("Seat initial refresh done %.1fs after activation", time.time() - activate_start)
+            self.seat_data.refresh_pos_contents()
+            self.log.info("Seat pos contents loaded %.1fs after activation", time.time() - activate_start)
+        except Exception:
+            self.log.exception("Seat initial refresh failed, serving data from the snapshot")
+
     def _poller_check_pos(self, thresholdtmp=None):
-        """Executes checks on the pos itself"""
-        threshold = thresholdtmp if thresholdtmp else self.config['FUEL_THRESHOLD']
-        for starbase in self.seat_data.get_all_starbases():
-            # check fuel
-            if starbase.check_fuel(threshold) and starbase.warn.fuel:
-                self.send(self.build_identifier(self.config['REPORT_POS_CHAN']),
-                          "**Fuel:** Tower is running out of fuel in %s hours - %s - %s - %s | "
-                          "Use *!pos silencefuel %s* to mute" % (
-                              round(starbase.pos_fuel_hours_left()), starbase.moon, starbase.type, starbase.corp,
-                              starbase.id,))
+        """Executes checks on the pos itself, only towers whose data changed since the last run are re-evaluated"""
+        started = time.perf_counter()
+        alerts = self.outbox.added
+        threshold = int(thresholdtmp if thresholdtmp else self.config['FUEL_THRESHOLD'])
+        low_fuel = self._poller_check_fuel(threshold)
+
+        # check for outdated
+        outdated = self.seat_data.find_outdated_starbases(time.time())
+        for starbase in outdated:
+            if starbase.check_outdated():
+                self.outbox.add(self.config['REPORT_POS_CHAN'], 'Outdated',
+                                "%s - %s - %s is outdated, please check corp key" % (
+                                    starbase.moon, starbase.type, starbase.corp))
+
+        changed = self.seat_data.pop_starbase_changes()
+        for starbaseid, changes in changed.items():
+            starbase = self.seat_data.get_starbase_by_id(starbaseid)
+            if starbase is None:
+                continue
+            new = 'new' in changes
+
             # assume refilled
-            elif starbase.check_refuelled():
+            if (new or 'fuel' in changes) and starbase.id not in low_fuel and starbase.check_refuelled() \
+                    and not starbase.warn.fuel:
                 starbase.warn.fuel = True
+                self.seat_data.trigger_save(starbase)
 
-            # check reinforcement
-            if starbase.check_reinforced() and starbase.warn.reinf:
-                self.send(self.build_identifier(self.config['REPORT_REINF_CHAN']),
-                          "**Reinforced:** %s - %s - %s got reinforced. Timer: %s" % (
-                              starbase.moon, starbase.type, starbase.corp, starbase.stateTimeStamp))
-                # Only warn once
-                starbase.warn.reinf = False
-            # check for outdated
-            if starbase.check_outdated():
-                self.send(self.build_identifier(self.config['REPORT_POS_CHAN']),
-                          "**Outdated**: %s - %s - %s is outdated, please check corp key" % (
-                              starbase.moon, starbase.type, starbase.corp))
+            if new or 'state' in changes:
+                # check reinforcement
+                if starbase.check_reinforced() and starbase.warn.reinf:
+                    self.outbox.add(self.config['REPORT_REINF_CHAN'], 'Reinforced',
+                                    "%s - %s - %s got reinforced. Timer: %s" % (
+                                        starbase.moon, starbase.type, starbase.corp, starbase.stateTimeStamp))
+                    # Only warn once
+                    starbase.warn.reinf = False
+                    self.seat_data.trigger_save(starbase)
+                # out of reinforcement, warn again next time
+                elif not starbase.check_reinforced() and not starbase.warn.reinf:
+                    starbase.warn.reinf = True
+                    self.seat_data.trigger_save(starbase)
+
+            if new or 'stront' in changes or 'state' in changes:
+                # check for empty stront
+                if starbase.check_empty_stront() and starbase.warn.stront:
+                    self.outbox.add(self.config['REPORT_POS_CHAN'], 'Stront',
+                                    "%s - %s - %s - %s has no strontium." % (
+                                        starbase.moon, starbase.type, starbase.corp, starbase.name))
+                # assume restronted
+                elif starbase.check_stront_refuelled() and not starbase.warn.stront:
+                    starbase.warn.stront = True
+                    self.seat_data.trigger_save(starbase)
 
-            # check for empty stront
-            if starbase.check_empty_stront() and starbase.warn.stront:
-                self.send(self.build_identifier(self.config['REPORT_POS_CHAN']),
-                          "**Location:** %s **Type:** %s **Corp:** %s **Name:** %s has no strontium." % (
-                        starbase.moon, starbase.type, starbase.corp, starbase.name))
-            # assume restronted
-            elif starbase.check_stront_refuelled():
-                starbase.warn.stront = True
+        self.seat_data.stats.record_poll('check_pos', time.perf_counter() - started,
+                                         len(low_fuel) + len(outdated) + len(changed), self.outbox.added - alerts)
 
-        self.seat_data.trigger_save()  # TODO: This should be detected internally somehow
+    def _poller_check_fuel(self, threshold=None, only_new=False):
+        """
+        Warns about towers that drop below the fuel threshold and schedules the next check for the moment the next
+        tower crosses it.
+        :param threshold: int Hours of fuel left to alert on
+        :param only_new: bool Only warn about towers that crossed the threshold since the last check
+        :return: set of starbase ids below the threshold
+        """
+        started = time.perf_counter()
+        alerts = self.outbox.added
+        threshold = int(threshold if threshold else self.config['FUEL_THRESHOLD'])
+        now = time.time()
+        # towers with less than an hour left are considered empty, like in check_fuel
+        start = now + 3600
+        end = now + threshold * 3600
+        if only_new:
+            start = max(start, self.fuel_checked_until)
+        low_fuel = self.seat_data.find_starbases_fuel_expiring(start, end)
+        self.fuel_checked_until = end
+        for starbase in low_fuel:
+            if starbase.warn.fuel:
+                self.outbox.add(self.config['REPORT_POS_CHAN'], 'Fuel',
+                                "Tower is running out of fuel in %s hours - %s - %s - %s | "
+                                "Use *!pos silencefuel %s* to mute" % (
+                                    round(starbase.projected_fuel_hours_left(now)), starbase.moon, starbase.type,
+                                    starbase.corp, starbase.id,))
+
+        self._schedule_fuel_check(threshold, now)
+        self.seat_data.stats.record_poll('check_fuel', time.perf_counter() - started, len(low_fuel),
+                                         self.outbox.added - alerts)
+        return {starbase.id for starbase in low_fuel}
+
+    def _schedule_fuel_check(self, threshold, now):
+        """Runs the fuel check again once the next tower crosses the threshold, if that is before the next sweep"""
+        if self.fuel_timer is not None:
+            self.fuel_timer.cancel()
+            self.fuel_timer = None
+        next_warning = self.seat_data.next_fuel_warning(threshold, now)
+        if next_warning is not None and next_warning - now < 3600:
+            self.fuel_timer = threading.Timer(next_warning - now + 1, self._poller_check_fuel, (threshold, True))
+            self.fuel_timer.daemon = True
+            self.fuel_timer.start()
 
     def _poller_check_pos_modules(self):
         """Executes checks on pos modules"""
-        for starbase in self.seat_data.get_all_starbases():
-            poscontent = self.seat_data._get_seat_pos_contents(starbase.corp.id, starbase.id)  # TODO
-
-            for module_json in poscontent['modules']:
-                module = Module.factory(module_json)
+        self.seat_data.refresh_pos_contents()
+        started = time.perf_counter()
+        alerts = self.outbox.added
+        starbases = list(self.seat_data.get_all_starbases())
+        for starbase in starbases:
+            for module in self.seat_data.get_pos_modules(starbase) or []:
                 if type(module) is Silo:
-                    module.set_contents(self.seat_data._get_seat_silo_contents(starbase.corp.id, module.itemID))  # TODO
                     # check for full
                     if module.silo_full() and starbase.warn.full:
-                        self.send(self.build_identifier(self.config['REPORT_POS_CHAN']),
-                                  "**Full:** Silo/CouplingArray is full: %s - %s - %s"
-                                  " | Use *!pos silencefull %s* to mute" % (
-                                      starbase.moon, starbase.type, starbase.corp, starbase.id))
+                        self.outbox.add(self.config['REPORT_POS_CHAN'], 'Full',
+                                        "Silo/CouplingArray is full: %s - %s - %s"
+                                        " | Use *!pos silencefull %s* to mute" % (
+                                            starbase.moon, starbase.type, starbase.corp, starbase.id))
                     # assume emptied
                     elif module.silo_emptied() and not starbase.warn.full:
                         starbase.warn.full = True
+                        self.seat_data.trigger_save(starbase)
 
-        self.seat_data.trigger_save()  # TODO: This should be detected internally somehow
+        # silos filling slower than usual, once per new sample
+        now = time.time()
+        for starbase, siloid, rate, usual in self.seat_data.find_siphon_anomalies(self.anomalies_checked_until):
+            silo = next((module for module in self.seat_data.get_pos_modules(starbase) or []
+                         if module.itemID == siloid), None)
+            # a full silo stops filling without a siphon
+            if silo is None or silo.silo_full():
+                continue
+            self.outbox.add(self.config['REPORT_POS_CHAN'], 'Siphon',
+                            "Silo fills at %.0f/h instead of %.0f/h, possible siphon: %s - %s - %s" % (
+                                rate, usual, starbase.moon, starbase.type, starbase.corp))
+        self.anomalies_checked_until = now
+
+        self.seat_data.stats.record_poll('check_pos_modules', time.perf_counter() - started, len(starbases),
+                                         self.outbox.added - alerts)
 
     ####################################################################################################################
     # bot commands
     @botcmd
     def pos_find(self, msg, args):
-        """Finds all towers in given <system>, Usage !pos find <system>"""
-        if args == '':
-            yield 'Usage: !pos find <system>'
+        """Finds all towers in given <system>, Usage !pos find <system> [--page <n>] [--limit <n>]"""
+        args, page, limit = self._paging_options(args)
+        if not args:
+            yield 'Usage: !pos find <system> [--page <n>] [--limit <n>]'
             return
-        results = 0
-        for starbase in self.seat_data.get_all_starbases():
-            if starbase.solarsystem.lower() == args.lower():
-                results += 1
-                fuel_left = starbase.pos_fuel_hours_left()
-                stront_left = starbase.pos_stront_hours_left()
-                yield "**Location:** %s **Type:** %s **Corp:** %s **Name:** %s " \
-                      "**Fuel left**: %sh **Stront timer**: %sh" % (
-                        starbase.moon, starbase.type, starbase.corp, starbase.name, round(fuel_left),
-                        round(stront_left))
-        if results == 0:
-            yield "There are no starbases in %s" % args
-        else:
-            yield "Found %s starbases total." % results
+        yield from self._pages(('pos find', args.casefold(), limit), page, lambda: self._result_lines(
+            [self._starbase_line(starbase) + " **Fuel left**: %sh **Stront timer**: %sh" % (
+                round(starbase.pos_fuel_hours_left()), round(starbase.pos_stront_hours_left()))
+             for starbase in self.seat_data.find_starbases_by_system(args)],
+            limit, "There are no starbases in %s" % args, "Found %s starbases total."))
 
     @botcmd
     def poco_find(self, msg, args):
-        """Finds all pocos in given <system>, Usage !poco find <system>"""
-        if args == '':
-            yield 'Usage: !poco find <system>'
+        """Finds all pocos in given <system>, Usage !poco find <system> [--page <n>] [--limit <n>]"""
+        args, page, limit = self._paging_options(args)
+        if not args:
+            yield 'Usage: !poco find <system> [--page <n>] [--limit <n>]'
+            return
+        yield from self._pages(('poco find', args.casefold(), limit), page, lambda: self._result_lines(
+            ["**Location:** %s - %s **Type:** %s **Corp:** %s **Reinforcement**: set to %sh" % (
+                poco.solarsystem, poco.planetName, poco.planetTypeName, poco.corp, poco.reinforceHour)
+             for poco in self.seat_data.find_pocos_by_system(args)],
+            limit, "There are no pocos in %s" % args, "Found %s pocos total."))
+
+    @botcmd
+    def poco_window(self, msg, args):
+        """Finds all pocos leaving reinforcement between two hours, Usage: !poco window <from> <to> [system|corp]"""
+        args, page, limit = self._paging_options(args)
+        words = (args or '').split()
+        if not 2 <= len(words) <= 3 or not all(word.isdigit() and int(word) < 24 for word in words[:2]) or \
+                words[2:] not in ([], ['system'], ['corp']):
+            yield 'Usage: !poco window <from> <to> [system|corp] [--page <n>] [--limit <n>]'
+            return
+        start, end = int(words[0]), int(words[1])
+        group = words[2] if len(words) == 3 else None
+        yield from self._pages(('poco window', start, end, group, limit), page,
+                               lambda: self._render_poco_window(start, end, group, limit))
+
+    def _render_poco_window(self, start, end, group, limit):
+        pocos = self.seat_data.find_pocos_by_reinforce_window(start, end)
+        empty = "There are no pocos leaving reinforcement between %s:00 and %s:59" % (start, end)
+        if group is None:
+            return self._result_lines(
+                ["**Reinforcement**: %sh **Location:** %s - %s **Type:** %s **Corp:** %s" % (
+                    poco.reinforceHour, poco.solarsystem, poco.planetName, poco.planetTypeName, poco.corp)
+                 for poco in pocos], limit, empty, "Found %s pocos total.")
+        groups = {}
+        for poco in pocos:
+            groups.setdefault(poco.solarsystem if group == 'system' else str(poco.corp), []).append(poco)
+        if not groups:
+            return [empty]
+        # the groups with the most pocos to defend first, limit counts groups
+        names = sorted(groups, key=lambda name: (-len(groups[name]), name))
+        lines = []
+        for name in names[:limit]:
+            lines.append("**%s:** %s pocos" % (name, len(groups[name])))
+            lines.extend("%sh %s - %s%s" % (poco.reinforceHour, poco.planetName, poco.planetTypeName,
+                                           " - %s" % poco.corp if group == 'system' else "")
+                         for poco in groups[name])
+        summary = "Found %s pocos in %s %s." % (len(pocos), len(groups), "systems" if group == 'system' else "corps")
+        if limit is not None and limit < len(groups):
+            summary += " Showing the first %s." % limit
+        return lines + [summary]
+
+    @botcmd
+    def pos_near(self, msg, args):
+        """Finds all towers within <jumps> of a system, Usage: !pos near <system> <jumps>"""
+        yield from self._near('pos near', args, lambda system: [
+            self._starbase_line(starbase) for starbase in self.seat_data.find_starbases_by_system(system)],
+            "starbases")
+
+    @botcmd
+    def poco_near(self, msg, args):
+        """Finds all pocos within <jumps> of a system, Usage: !poco near <system> <jumps>"""
+        yield from self._near('poco near', args, lambda system: [
+            "**Location:** %s - %s **Type:** %s **Corp:** %s **Reinforcement**: set to %sh" % (
+                poco.solarsystem, poco.planetName, poco.planetTypeName, poco.corp, poco.reinforceHour)
+            for poco in self.seat_data.find_pocos_by_system(system)], "pocos")
+
+    def _near(self, command, args, find, kind):
+        """
+        Shared part of the near commands, joins the systems within range with the system index of the records
+        :param command: str name of the command
+        :param args: str command arguments
+        :param find: function(system) -> list of str result rows of the records in a system
+        :param kind: str plural of the records for the summary
+        """
+        args, page, limit = self._paging_options(args)
+        words = (args or '').split()
+        if len(words) < 2 or not words[-1].isdigit():
+            yield 'Usage: !%s <system> <jumps> [--page <n>] [--limit <n>]' % command
+            return
+        if self.jumps is None:
+            yield "Jump data is not loaded, see SEAT_JUMPS and the log."
+            return
+        system, jumps = " ".join(words[:-1]), int(words[-1])
+        if system not in self.jumps:
+            yield "There is no system %s in the jump data." % system
             return
-        results = 0
-        for poco in self.seat_data.get_all_pocos():
-            if poco.solarsystem.lower() == args.lower():
-                results += 1
-                yield "**Location:** %s - %s **Type:** %s **Corp:** %s **Reinforcement**: set to %sh" % (
-                    poco.solarsystem, poco.planetName, poco.planetTypeName, poco.corp,
-                    poco.reinforceHour)
-
-        if results == 0:
-            yield "There are no pocos in %s" % args
-        else:
-            yield "Found %s pocos total." % results
+        yield from self._pages((command, system.casefold(), jumps, limit), page, lambda: self._result_lines(
+            ["**Jumps:** %s %s" % (distance, row)
+             for name, distance in self.jumps.within(system, jumps) for row in find(name)],
+            limit, "There are no %s within %s jumps of %s" % (kind, jumps, self.jumps.name(system)),
+            "Found %%s %s total." % kind))
 
     @botcmd
     def pos_oof(self, msg, args):
-        """Finds all towers that will be running out of fuel in the given timeframe, Usage: !pos oof <hours>"""
-        if args == '' or args.isdigit() is False:
-            yield 'Usage: !pos oof <hours>'
+        """Finds all towers running out of fuel within <hours>, Usage: !pos oof <hours> [--page <n>] [--limit <n>]"""
+        args, page, limit = self._paging_options(args)
+        if not args or args.isdigit() is False:
+            yield 'Usage: !pos oof <hours> [--page <n>] [--limit <n>]'
             return
-        results = 0
-        for starbase in self.seat_data.get_all_starbases():
-            hours_left = starbase.pos_fuel_hours_left()
-            if int(hours_left) < int(args) and int(hours_left) != 0:
-                results += 1
-                yield "**Location:** %s **Type:** %s **Corp:** %s **Name:** %s **Hours of fuel left:** %s" % (
-                    starbase.moon, starbase.type, starbase.corp, starbase.name, round(hours_left))
-            if results == 0:
-                yield "Did not found any towers."
-            else:
-                yield "Found %s starbases total." % results
+        now = time.time()
+        yield from self._pages(('pos oof', int(args), limit), page, lambda: self._result_lines(
+            [self._starbase_line(starbase) + " **Hours of fuel left:** %s" % round(
+                starbase.projected_fuel_hours_left(now))
+             for starbase in self.seat_data.find_starbases_fuel_expiring(now + 3600, now + int(args) * 3600)],
+            limit, "Did not found any towers.", "Found %s starbases total."))
 
     @botcmd
     def pos_oos(self, msg, args):
-        """Finds all towers that have no stront, Usage: !pos oos"""
+        """Finds all towers that have no stront, Usage: !pos oos [--page <n>] [--limit <n>]"""
+        args, page, limit = self._paging_options(args)
         if args != '':
-            yield 'Usage: !pos oos'
+            yield 'Usage: !pos oos [--page <n>] [--limit <n>]'
             return
-        results = 0
-        for starbase in self.seat_data.get_all_starbases():
-            if starbase.strontium == 0 and starbase.state == Starbase.STATE_ONLINE:
-                results += 1
-                yield "**Location:** %s **Type:** %s **Corp:** %s **Name:** %s has no strontium." % (
-                    starbase.moon, starbase.type, starbase.corp, starbase.name)
-        if results == 0:
-            yield "Did not found any towers without stront."
-        else:
-            yield "Found %s starbases total." % results
+        yield from self._pages(('pos oos', limit), page, lambda: self._result_lines(
+            [self._starbase_line(starbase) + " has no strontium."
+             for starbase in self.seat_data.find_starbases_without_stront()],
+            limit, "Did not found any towers without stront.", "Found %s starbases total."))
 
     @botcmd
     def pos_offline(self, msg, args):
-        """Finds all offline towers, Usage: !pos offline"""
+        """Finds all offline towers, Usage: !pos offline [--page <n>] [--limit <n>]"""
+        args, page, limit = self._paging_options(args)
         if args != '':
-            yield 'Usage: !pos offline'
+            yield 'Usage: !pos offline [--page <n>] [--limit <n>]'
             return
-        for starbase in self.seat_data.get_all_starbases():
-            if starbase.state == Starbase.STATE_ANCHORED or starbase.state == Starbase.STATE_UNANCHORED:
-                yield "**Location:** %s **Type:** %s **Corp:** %s **Name:** %s " % (
-                    starbase.moon, starbase.type, starbase.corp, starbase.name)
+        yield from self._pages(('pos offline', limit), page, lambda: self._result_lines(
+            [self._starbase_line(starbase) for starbase in
+             self.seat_data.find_starbases_by_state(Starbase.STATE_ANCHORED, Starbase.STATE_UNANCHORED)],
+            limit, "There are no offline towers.", "Found %s offline starbases total."))
 
     @botcmd
     def pos_checksiphon(self, msg, args):
-        """Locates possible siphons. Processing can take a while. Usage: !pos checksiphon"""
+        """Locates possible siphons, progress and results are sent as the scan goes. Usage: !pos checksiphon"""
         if args != '':
-            yield 'Usage: !pos checksiphon'
+            return 'Usage: !pos checksiphon'
+        with self.siphon_scan_lock:
+            # subscribers are keyed by their string form, the outbox builds the identifier again
+            if self.siphon_scan is not None and self.siphon_scan.attach(str(msg.frm)):
+                return "A siphon scan is already running, you will get its results."
+            self.siphon_scan = SiphonScan(self.seat_data, self._notify_scan_subscriber, self._report_siphon)
+            self.siphon_scan.attach(str(msg.frm))
+            self.siphon_scan.start()
+        return "Started siphon scan, you will get the results as towers are checked."
+
+    def _notify_scan_subscriber(self, subscriber, text):
+        self.outbox.add(subscriber, 'Siphon scan', text)
+
+    def _report_siphon(self, starbase):
+        self.outbox.add(self.config['REPORT_POS_CHAN'], 'Siphon', "Possible siphon detected: %s - %s - %s" % (
+            starbase.moon, starbase.type, starbase.corp))
+
+    @botcmd
+    def pos_fuelplan(self, msg, args):
+        """Fuel blocks and strontium needed per system and corp for the next <days>, Usage: !pos fuelplan <days>"""
+        args, page, limit = self._paging_options(args)
+        if not args or args.isdigit() is False:
+            yield 'Usage: !pos fuelplan <days> [--page <n>] [--limit <n>]'
             return
-        result = 0
-        for starbase in self.seat_data.get_all_starbases():
-            poscontent = self.seat_data._get_seat_pos_contents(starbase.corp.id, starbase.id)  # TODO
+        yield from self._pages(('pos fuelplan', int(args), limit), page,
+                               lambda: self._render_fuelplan(int(args), limit))
 
-            for module_json in poscontent['modules']:
-                module = Module.factory(module_json)
-                # 14343 for silo, 17982 for coupling arrays
-                if type(module) is Silo:
-                    module.set_contents(self.seat_data._get_seat_silo_contents(starbase.corp.id, module.itemID))  # TODO
-                    # check siphon
-                    if module.has_siphon():
-                        self.send(self.build_identifier(self.config['REPORT_POS_CHAN']),
-                                  "**Siphon:** Possible siphon detected: %s - %s - %s" % (
-                                      starbase.moon, starbase.type, starbase.corp))
-                        result += 1
-        if result == 0:
-            yield "Did not find any siphons."
+    def _render_fuelplan(self, days, limit):
+        """:return: list of str lines of the fuel plan, limit is the number of rows per corp and per system"""
+        plan = FuelPlan(self.seat_data.get_all_starbases(), days, time.time())
+        towers, fuel, loadable, stront, short = plan.total
+        if towers == 0:
+            return ["There are no online towers."]
+        lines = ["**Fuel plan for %s days:** %s towers need %s fuel blocks and %s strontium, %s m3. "
+                 "%s fuel blocks fit into the bays now, %s towers need a second trip." % (
+                     days, towers, fuel, stront, plan.volume(fuel, stront), loadable, short)]
+        for title, rows in (('Per corp', plan.corps), ('Per system', plan.systems)):
+            # biggest need first
+            rows = sorted(rows, key=lambda row: -row[2])
+            if limit is not None and limit < len(rows):
+                lines.append("**%s:** (first %s of %s)" % (title, limit, len(rows)))
+                rows = rows[:limit]
+            else:
+                lines.append("**%s:**" % title)
+            for name, towers, fuel, loadable, stront, short in rows:
+                lines.append("%s: %s towers, %s fuel (%s fit now), %s stront, %s m3%s" % (
+                    name, towers, fuel, loadable, stront, plan.volume(fuel, stront),
+                    ", %s short" % short if short else ""))
+        return lines
+
+    @botcmd
+    def pos_history(self, msg, args):
+        """Shows the fuel and stront history of a tower, Usage: !pos history <PosID> [hours]"""
+        parts = args.split()
+        if not 1 <= len(parts) <= 2 or not all(part.isdigit() for part in parts):
+            return 'Usage: !pos history <PosID> [hours]'
+        if self.history is None:
+            return "History is disabled."
+        starbase = self.seat_data.get_starbase_by_id(int(parts[0]))
+        if starbase is None:
+            return "There is no starbase %s" % parts[0]
+        now = time.time()
+        samples = self.history.tower_samples(starbase.id, now - int(parts[1] if len(parts) == 2 else 24) * 3600, now)
+        lines = ["**Location:** %s **Type:** %s **Corp:** %s **Fuel usage:** %s/h %s" % (
+            starbase.moon, starbase.type, starbase.corp, round(starbase.fuel_rate or starbase.baseFuelUsage, 1),
+            "measured" if starbase.fuel_rate else "nominal")]
+        for updated, fuel, stront in samples:
+            lines.append("%s **Fuel:** %s **Stront:** %s" % (
+                time.strftime('%Y-%m-%d %H:%M', time.gmtime(updated)), fuel, stront))
+        if not samples:
+            lines.append("No samples in that timeframe.")
+        return "\n".join(lines)
 
     ## Silence Commands
     @botcmd
@@ -223,7 +576,7 @@ class Seat(BotPlugin):
             return 'Usage: !pos silencefuel <posID>'
         starbase = self.seat_data.get_starbase_by_id(int(args))
         starbase.warn.fuel = False
-        self.seat_data.trigger_save()  # TODO
+        self.seat_data.trigger_save(starbase)
         return "Silenced %s" % starbase.moon
 
     @botcmd
@@ -233,7 +586,7 @@ class Seat(BotPlugin):
             return 'Usage: !pos silencefull <posID>'
         starbase = self.seat_data.get_starbase_by_id(int(args))
         starbase.warn.full = False
-        self.seat_data.trigger_save()  # TODO
+        self.seat_data.trigger_save(starbase)
         return "Silenced %s" % starbase.moon
 
     @botcmd
@@ -243,22 +596,38 @@ class Seat(BotPlugin):
             return 'Usage: !pos silencestront <posID>'
         starbase = self.seat_data.get_starbase_by_id(int(args))
         starbase.warn.stront = False
-        self.seat_data.trigger_save()  # TODO
+        self.seat_data.trigger_save(starbase)
         return "Silenced %s" % starbase.moon
 
     ## Admin Commands
     @botcmd(admin_only=True)
     def pos_refetch(self, msg, args):
         """Refetches seat pos API data"""
-        self.seat_data.fetch_starbases()
+        if not self.seat_data.fetch_starbases():
+            return "SeAT did not answer for every corp, some pos data is stale"
         return "Refetched seat pos data"
 
     @botcmd(admin_only=True)
     def poco_refetch(self, msg, args):
         """Refetches seat poco API data"""
-        self.seat_data.fetch_pocos()
+        if not self.seat_data.fetch_pocos():
+            return "SeAT did not answer for every corp, some poco data is stale"
         return "Refetched seat poco data"
 
+    @botcmd(admin_only=True)
+    def seat_stats(self, msg, args):
+        """Shows api and poller metrics, Usage: !seat stats [json]"""
+        circuits = self.seat_data.circuit_states()
+        if args == 'json':
+            return json.dumps(dict(self.seat_data.stats.snapshot(), circuits=circuits), indent=2)
+        if args != '':
+            return 'Usage: !seat stats [json]'
+        age = self.seat_data.data_age()
+        return "%s\nCircuits: %s\nData age: %s" % (
+            self.seat_data.stats.render(),
+            ", ".join("%s %s" % (endpoint, state) for endpoint, state in sorted(circuits.items())) or "none",
+            "%.0fs" % age if age is not None else "unknown")
+
     @botcmd(admin_only=True, hidden=True)
     def pos_triggerposcheck(self, msg, args):
         """Manually executes the checks on the pos itself"""
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the plugin is loaded by errbot from its directory, models is imported as a top level package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
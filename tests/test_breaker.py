@@ -0,0 +1,90 @@
+import threading
+import pytest
+from models import breaker
+from models.breaker import CircuitBreaker, RetryBudget
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    circuit = CircuitBreaker(threshold=3, reset=60)
+    for _ in range(2):
+        circuit.failure()
+        assert circuit.allow()
+    circuit.failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert not circuit.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    circuit = CircuitBreaker(threshold=3, reset=60)
+    circuit.failure()
+    circuit.failure()
+    circuit.success()
+    circuit.failure()
+    circuit.failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+def test_single_trial_call_after_reset(clock):
+    circuit = CircuitBreaker(threshold=1, reset=60)
+    circuit.failure()
+    clock[0] += 59
+    assert not circuit.allow()
+    clock[0] += 1
+    assert circuit.allow()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    # further calls wait for the outcome of the trial
+    assert not circuit.allow()
+
+
+def test_trial_success_closes(clock):
+    circuit = CircuitBreaker(threshold=1, reset=60)
+    circuit.failure()
+    clock[0] += 60
+    assert circuit.allow()
+    circuit.success()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow()
+
+
+def test_trial_failure_reopens_for_another_reset(clock):
+    circuit = CircuitBreaker(threshold=5, reset=60)
+    for _ in range(5):
+        circuit.failure()
+    clock[0] += 60
+    assert circuit.allow()
+    circuit.failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    clock[0] += 59
+    assert not circuit.allow()
+    clock[0] += 1
+    assert circuit.allow()
+
+
+def test_retry_budget_is_spent_once():
+    budget = RetryBudget(2)
+    assert budget.take()
+    assert budget.take()
+    assert not budget.take()
+    assert budget.remaining == 0
+
+
+def test_retry_budget_shared_by_threads():
+    budget = RetryBudget(100)
+    taken = []
+
+    def take():
+        taken.extend(budget.take() for _ in range(50))
+
+    threads = [threading.Thread(target=take) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert taken.count(True) == 100
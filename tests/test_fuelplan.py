@@ -0,0 +1,51 @@
+import random
+import time
+import pytest
+from models import fuelplan
+from models.eveentities import Corp
+from models.fuelplan import FuelPlan
+from models.starbases import Starbase
+
+NOW = 1700000000
+STATES = [Starbase.STATE_ONLINE] * 4 + [Starbase.STATE_ANCHORED, Starbase.STATE_REINFORCED]
+
+
+def fleet(count, seed=7):
+    rng = random.Random(seed)
+    corps = [Corp({'corporationID': i, 'ticker': 'C%s' % i}) for i in range(5)]
+    starbases = []
+    for i in range(count):
+        fuel_bay = rng.choice([35000, 70000, 140000])
+        starbase = Starbase({
+            'itemID': i, 'starbaseName': 'Tower %s' % i, 'starbaseTypeName': 'Amarr Control Tower',
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(NOW - rng.randrange(0, 48 * 3600))),
+            'onAggression': 0, 'solarSystemName': 'System %s' % rng.randrange(12), 'moonName': 'Moon %s' % i,
+            'baseFuelUsage': rng.choice([10, 20, 40]), 'fuelBaySize': fuel_bay,
+            'fuelBlocks': rng.randrange(0, fuel_bay // 5), 'baseStrontUsage': 100, 'strontBaySize': 50000,
+            'strontium': rng.randrange(0, 16000), 'state': rng.choice(STATES), 'stateTimeStamp': None,
+        }, rng.choice(corps))
+        if rng.random() < 0.3:
+            # measured usage, e.g. with a sovereignty discount
+            starbase.set_fuel_rate(starbase.baseFuelUsage * rng.uniform(0.7, 1.0))
+        starbases.append(starbase)
+    return starbases
+
+
+@pytest.mark.skipif(fuelplan.numpy is None, reason="numpy is not installed")
+@pytest.mark.parametrize('days', [0.5, 1, 7, 30])
+def test_numpy_matches_python(days):
+    starbases = [starbase for starbase in fleet(500) if starbase.state == Starbase.STATE_ONLINE]
+    assert FuelPlan._plan_numpy(starbases, days, NOW) == FuelPlan._plan_python(starbases, days, NOW)
+
+
+@pytest.mark.skipif(fuelplan.numpy is None, reason="numpy is not installed")
+def test_numpy_matches_python_without_towers():
+    assert FuelPlan._plan_numpy([], 7, NOW) == FuelPlan._plan_python([], 7, NOW)
+
+
+def test_only_online_towers_are_planned():
+    starbases = fleet(200)
+    plan = FuelPlan(starbases, 7, NOW)
+    assert plan.total[0] == sum(starbase.state == Starbase.STATE_ONLINE for starbase in starbases)
+    assert sum(row[1] for row in plan.systems) == plan.total[0]
+    assert sum(row[1] for row in plan.corps) == plan.total[0]
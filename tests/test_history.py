@@ -0,0 +1,72 @@
+import sqlite3
+import pytest
+from models.history import History
+
+HOUR = 3600
+
+
+@pytest.fixture
+def history():
+    history = History(':memory:')
+    yield history
+    history.close()
+
+
+def test_fuel_rate_leaves_out_refuels(history):
+    # 10 blocks per hour, refuelled between the 4th and 5th sample
+    fuel = [1000, 990, 980, 970, 5000, 4990, 4980, 4970]
+    history.add_tower_samples([(1, i * HOUR, blocks, 0) for i, blocks in enumerate(fuel)])
+    assert history.fuel_rates(0) == {1: pytest.approx(10)}
+
+
+def test_fuel_rate_needs_min_span(history):
+    history.add_tower_samples([(1, i * HOUR, 1000 - 10 * i, 0) for i in range(3)])
+    assert history.fuel_rates(0, min_span=6 * HOUR) == {}
+    assert history.fuel_rates(0, min_span=2 * HOUR) == {1: pytest.approx(10)}
+
+
+def test_fuel_rate_only_uses_samples_since(history):
+    history.add_tower_samples([(1, i * HOUR, 1000 - (40 if i < 4 else 10) * i, 0) for i in range(12)])
+    assert history.fuel_rates(4 * HOUR) == {1: pytest.approx(10)}
+
+
+def silo(history, quantities, siloid=1, starbaseid=10):
+    history.add_silo_samples([(siloid, i * HOUR, starbaseid, quantity) for i, quantity in enumerate(quantities)])
+
+
+def test_slow_filling_silo_is_an_anomaly(history):
+    silo(history, [100 * i + 100 for i in range(8)] + [810])
+    assert history.silo_anomalies(0) == [(1, 10, pytest.approx(10), pytest.approx(100))]
+
+
+def test_steady_silo_is_not_an_anomaly(history):
+    silo(history, [100 * i + 100 for i in range(9)])
+    assert history.silo_anomalies(0) == []
+
+
+def test_emptied_silo_is_not_an_anomaly(history):
+    # emptied by players between two samples, the next sample already holds a few units
+    silo(history, [100 * i + 100 for i in range(8)] + [50])
+    assert history.silo_anomalies(0) == []
+
+
+def test_emptying_does_not_skew_the_usual_rate(history):
+    silo(history, [100, 200, 300, 400, 20, 120, 220, 320, 420, 430])
+    assert history.silo_anomalies(0) == [(1, 10, pytest.approx(10), pytest.approx(100))]
+
+
+def test_silo_anomaly_needs_min_intervals(history):
+    silo(history, [100, 200, 300, 310])
+    assert history.silo_anomalies(0, min_intervals=4) == []
+
+
+def test_silo_anomaly_only_reported_after(history):
+    silo(history, [100 * i + 100 for i in range(8)] + [810])
+    assert history.silo_anomalies(0, after=8 * HOUR) == []
+    assert len(history.silo_anomalies(0, after=8 * HOUR - 1)) == 1
+
+
+def test_old_sqlite_is_refused(monkeypatch):
+    monkeypatch.setattr('sqlite3.sqlite_version_info', (3, 24, 0))
+    with pytest.raises(sqlite3.Error, match="too old"):
+        History(':memory:')
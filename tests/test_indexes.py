@@ -0,0 +1,75 @@
+from models.indexes import Index, RangeIndex
+
+
+class Record:
+    def __init__(self, id, value):
+        self.id = id
+        self.value = value
+
+
+def test_index_moves_a_record_to_its_new_key():
+    index = Index(lambda record: record.value)
+    index.add(Record(1, 'a'))
+    index.add(Record(1, 'b'))
+    assert index.get('a') == []
+    assert [record.id for record in index.get('b')] == [1]
+    index.remove(1)
+    assert index.buckets == {} and index.keys == {}
+
+
+def test_range_is_half_open_and_ordered():
+    index = RangeIndex(lambda record: record.value)
+    for id, value in [(1, 30), (2, 10), (3, 20), (4, 20), (5, 40)]:
+        index.add(Record(id, value))
+    assert [record.id for record in index.range(20, 40)] == [3, 4, 1]
+    assert index.range(41, 100) == []
+    assert index.range(40, 40) == []
+
+
+def test_range_reindexes_a_changed_record():
+    index = RangeIndex(lambda record: record.value)
+    index.add(Record(1, 10))
+    index.add(Record(2, 20))
+    index.add(Record(1, 30))
+    assert [record.id for record in index.range(0, 100)] == [2, 1]
+    assert index.range(10, 11) == []
+    assert len(index.entries) == 2
+
+
+def test_remove_keeps_records_with_equal_keys():
+    index = RangeIndex(lambda record: record.value)
+    for id in range(5):
+        index.add(Record(id, 10))
+    index.remove(2)
+    index.remove(2)
+    assert [record.id for record in index.range(10, 11)] == [0, 1, 3, 4]
+
+
+def test_first_after_skips_equal_keys():
+    index = RangeIndex(lambda record: record.value)
+    for id, value in [(1, 10), (2, 20), (3, 20), (4, 30)]:
+        index.add(Record(id, value))
+    assert index.first_after(5).id == 1
+    assert index.first_after(10).id == 2
+    assert index.first_after(20).id == 4
+    assert index.first_after(30) is None
+
+
+def test_float_keys():
+    index = RangeIndex(lambda record: record.value)
+    index.add(Record(1, 10.5))
+    index.add(Record(2, 10))
+    assert [record.id for record in index.range(10, 10.5)] == [2]
+    assert index.first_after(10.25).id == 1
+
+
+def test_index_returns_records_ordered_by_id():
+    index = Index(lambda record: record.value)
+    for id in [5, 3, 9, 1]:
+        index.add(Record(id, 'a'))
+    assert [record.id for record in index.get('a')] == [1, 3, 5, 9]
+    index.add(Record(4, 'a'))
+    index.add(Record(3, 'b'))
+    index.add(Record(3, 'a'))
+    assert [record.id for record in index.get('a')] == [1, 3, 4, 5, 9]
+    assert [record.id for record in index.get('b')] == []
@@ -0,0 +1,48 @@
+import json
+import pytest
+from models.jsonstream import iter_array
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+RECORDS = [{'itemID': i, 'moonName': 'Jita IV - Moon %s ✓' % i, 'state': 4, 'empty': {}} for i in range(20)]
+DOCUMENT = json.dumps(RECORDS, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, len(DOCUMENT)])
+def test_every_chunk_size(size):
+    # a size of 1 splits every token and the three byte check mark
+    assert list(iter_array(chunked(DOCUMENT, size))) == RECORDS
+
+
+def test_whitespace_and_separators_between_chunks():
+    chunks = [b' \n[', b' ', b'{"a": 1}', b' ,', b'\n', b'{"a": ', b'2}', b' ', b']', b' \n']
+    assert list(iter_array(chunks)) == [{'a': 1}, {'a': 2}]
+
+
+def test_empty_array():
+    assert list(iter_array([b'[', b' ]'])) == []
+
+
+def test_not_an_array():
+    with pytest.raises(ValueError, match="Expected a JSON array"):
+        list(iter_array([b'{"a": 1}']))
+
+
+def test_stream_ends_between_elements():
+    with pytest.raises(ValueError, match="JSON array ended early"):
+        list(iter_array([b'[{"a": 1}, ']))
+
+
+def test_stream_ends_inside_an_element():
+    elements = iter_array([b'[{"a": 1}, {"a": '])
+    assert next(elements) == {'a': 1}
+    with pytest.raises(ValueError):
+        next(elements)
+
+
+def test_empty_stream():
+    with pytest.raises(ValueError, match="JSON array ended early"):
+        list(iter_array([]))
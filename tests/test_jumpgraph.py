@@ -0,0 +1,61 @@
+import pytest
+from models.jumpgraph import JumpGraph
+
+
+@pytest.fixture
+def graph():
+    # A - B - C - D, B - E, a loop C - F - G - C and an isolated pair X - Y
+    return JumpGraph([('A', 'B'), ('B', 'A'), ('B', 'C'), ('C', 'D'), ('B', 'E'), ('C', 'F'), ('F', 'G'),
+                      ('G', 'C'), ('X', 'Y'), ('A', 'A')], cached_rows=2)
+
+
+def test_within_groups_systems_by_distance(graph):
+    systems = graph.within('A', 3)
+    assert systems[0] == ('A', 0)
+    assert [distance for _, distance in systems] == sorted(distance for _, distance in systems)
+    assert dict(systems) == {'A': 0, 'B': 1, 'C': 2, 'E': 2, 'D': 3, 'F': 3, 'G': 3}
+
+
+def test_within_each_prefix(graph):
+    assert graph.within('A', 0) == [('A', 0)]
+    assert dict(graph.within('A', 1)) == {'A': 0, 'B': 1}
+    assert dict(graph.within('C', 1)) == {'C': 0, 'B': 1, 'D': 1, 'F': 1, 'G': 1}
+
+
+def test_within_beyond_the_farthest_system(graph):
+    assert dict(graph.within('A', 100)) == dict(graph.within('A', 3))
+    assert graph.within('X', 5) == [('X', 0), ('Y', 1)]
+
+
+def test_lookups_ignore_case(graph):
+    assert 'b' in graph
+    assert graph.name('b') == 'B'
+    assert graph.within('a', 1) == graph.within('A', 1)
+    assert graph.within('Jita', 1) is None
+    assert graph.name('Jita') is None
+
+
+def test_cached_rows_are_bounded_and_reused(graph):
+    for system in ('A', 'B', 'C', 'A'):
+        graph.within(system, 2)
+    assert list(graph.rows) == [graph.ids['c'], graph.ids['a']]
+    assert graph.within('A', 2) == graph.within('A', 2)
+
+
+def test_self_jumps_are_ignored(graph):
+    assert len(graph) == 9
+    assert graph.within('A', 1).count(('A', 0)) == 1
+
+
+def test_load(tmp_path):
+    path = tmp_path / 'jumps.csv'
+    path.write_text("fromSolarSystemName,toSolarSystemName,extra\nJita,Perimeter,1\nPerimeter,Urlen,2\n",
+                    encoding='utf-8')
+    assert JumpGraph.load(str(path)).within('jita', 2) == [('Jita', 0), ('Perimeter', 1), ('Urlen', 2)]
+
+
+def test_load_without_name_columns(tmp_path):
+    path = tmp_path / 'jumps.csv'
+    path.write_text("from,to\n1,2\n", encoding='utf-8')
+    with pytest.raises(KeyError):
+        JumpGraph.load(str(path))
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+import pytest
+from models.pagecache import PageCache, paginate
+
+
+@pytest.fixture
+def Seat():
+    return pytest.importorskip('seat', reason="the plugin needs errbot").Seat
+
+
+def test_paginate_joins_lines_up_to_max_length():
+    assert paginate(['aaaa', 'bbbb', 'cccc'], max_length=9) == ['aaaa\nbbbb', 'cccc']
+    assert paginate(['aaaa', 'bbbb', 'cccc'], max_length=8) == ['aaaa', 'bbbb', 'cccc']
+
+
+def test_paginate_never_splits_a_line():
+    assert paginate(['a', 'b' * 20, 'c'], max_length=10) == ['a', 'b' * 20, 'c']
+
+
+def test_paginate_without_lines():
+    assert paginate([]) == ['']
+
+
+def test_paginate_keeps_every_line():
+    lines = ['row %s' % i for i in range(1000)]
+    pages = paginate(lines, max_length=100)
+    assert all(len(page) <= 100 for page in pages)
+    assert '\n'.join(pages).split('\n') == lines
+
+
+@pytest.mark.parametrize('args, expected', [
+    ('Jita', ('Jita', None, None)),
+    ('Jita --page 2', ('Jita', 2, None)),
+    ('--limit 50 Jita --page 3', ('Jita', 3, 50)),
+    ('', ('', None, None)),
+    ('Jita --page', (None, None, None)),
+    ('Jita --page 0', (None, None, None)),
+    ('Jita --limit x', (None, None, None)),
+    ('Jita --limit -1', (None, None, None)),
+])
+def test_paging_options(Seat, args, expected):
+    assert Seat._paging_options(args) == expected
+
+
+def test_result_lines(Seat):
+    assert Seat._result_lines([], None, "Nothing.", "%s rows.") == ["Nothing."]
+    assert Seat._result_lines(['a', 'b', 'c'], None, "Nothing.", "%s rows.") == ['a', 'b', 'c', "3 rows."]
+    assert Seat._result_lines(['a', 'b', 'c'], 2, "Nothing.", "%s rows.") == \
+        ['a', 'b', "3 rows. Showing the first 2."]
+
+
+def test_pages(Seat):
+    def pages(page, lines):
+        plugin = SimpleNamespace(pages=PageCache(), seat_data=SimpleNamespace(generation=0), message_length=72)
+        return list(Seat._pages(plugin, ('cmd',), page, lambda: lines))
+
+    lines = ['row %02d' % i for i in range(12)]
+    assert pages(None, lines[:2]) == ['row 00\nrow 01']
+    every = pages(None, lines)
+    assert len(every) == 3 and every[0].endswith("\n(page 1 of 3)")
+    assert pages(2, lines) == [every[1]]
+    assert pages(4, lines) == ["There are only 3 pages."]
+    assert pages(2, lines[:1]) == ["There is only 1 page."]
+
+
+def test_pages_are_rendered_once_per_generation(Seat):
+    cache = PageCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return ['row']
+
+    plugin = SimpleNamespace(pages=cache, seat_data=SimpleNamespace(generation=0), message_length=1900)
+    for generation in (0, 0, 1):
+        plugin.seat_data.generation = generation
+        list(Seat._pages(plugin, ('cmd',), None, render))
+    assert len(renders) == 2
@@ -0,0 +1,82 @@
+import pickle
+from models.seatdata import SeatData
+from models.starbases import Starbase
+
+UPDATED_AT = '2026-10-18 12:00:00'
+
+
+def starbase_json(id, system='Jita', state=Starbase.STATE_ONLINE):
+    return {'itemID': id, 'starbaseName': 'Tower %s' % id, 'starbaseTypeName': 'Amarr Control Tower',
+            'updated_at': UPDATED_AT, 'onAggression': 1, 'solarSystemName': system, 'moonName': 'Moon %s' % id,
+            'baseFuelUsage': 40, 'fuelBaySize': 140000, 'fuelBlocks': 1000 + id, 'baseStrontUsage': 400,
+            'strontBaySize': 50000, 'strontium': 2000, 'state': state, 'stateTimeStamp': None}
+
+
+def poco_json(id, hour=12):
+    return {'itemID': id, 'planetName': 'Planet %s' % id, 'planetTypeName': 'Gas', 'solarSystemName': 'Amarr',
+            'reinforceHour': hour}
+
+
+def saved_seat_data():
+    storage = {}
+    seat_data = SeatData(storage=storage)
+    corp = seat_data.intern_corp({'corporationID': 1, 'ticker': 'MAIN'})
+    other = seat_data.intern_corp({'corporationID': 2, 'ticker': 'ALLY'}, 'alliance')
+    seat_data._ingest_starbases(corp, [starbase_json(10), starbase_json(11, 'Amarr', Starbase.STATE_REINFORCED)])
+    seat_data._ingest_starbases(other, [starbase_json(20)])
+    seat_data._ingest_pocos(corp, [poco_json(30, 5)])
+    seat_data._ingest_pocos(other, [poco_json(40)])
+    warn = seat_data.get_starbase_by_id(10).warn
+    warn.fuel, warn.stront = False, False
+    seat_data.refreshed_at = 1700000000
+    seat_data.save()
+    # errbot pickles the plugin storage
+    return seat_data, pickle.loads(pickle.dumps(storage[SeatData.STORAGE_KEY]))
+
+
+def test_round_trip():
+    seat_data, snapshot = saved_seat_data()
+    loaded = SeatData()
+    loaded.load(snapshot)
+    assert {id: starbase.serialize() for id, starbase in loaded.starbases.items()} == \
+        {id: starbase.serialize() for id, starbase in seat_data.starbases.items()}
+    assert {id: poco.serialize() for id, poco in loaded.pocos.items()} == \
+        {id: poco.serialize() for id, poco in seat_data.pocos.items()}
+    warn = loaded.get_starbase_by_id(10).warn
+    assert (warn.fuel, warn.full, warn.reinf, warn.stront) == (False, True, True, False)
+    assert loaded.refreshed_at == 1700000000
+
+
+def test_round_trip_shares_corps_and_fills_indexes():
+    _, snapshot = saved_seat_data()
+    loaded = SeatData()
+    loaded.load(snapshot)
+    assert loaded.get_starbase_by_id(10).corp is loaded.get_starbase_by_id(11).corp is loaded.pocos[30].corp
+    assert str(loaded.get_starbase_by_id(20).corp) == 'ALLY@alliance'
+    assert [starbase.id for starbase in loaded.find_starbases_by_system('jita')] == [10, 20]
+    assert [starbase.id for starbase in loaded.find_starbases_by_state(Starbase.STATE_REINFORCED)] == [11]
+    assert [poco.id for poco in loaded.find_pocos_by_reinforce_window(5, 5)] == [30]
+    # changes since the last check were not persisted, every loaded tower is checked once
+    assert set(loaded.pop_starbase_changes()) == {10, 11, 20}
+
+
+def test_deleted_records_leave_the_snapshot():
+    seat_data, _ = saved_seat_data()
+    corp = seat_data.corps[1]
+    seat_data._ingest_starbases(corp, [starbase_json(10)])
+    seat_data._ingest_pocos(corp, [])
+    seat_data.save()
+    snapshot = seat_data.storage[SeatData.STORAGE_KEY]
+    assert sorted(snapshot['starbases']) == [10, 20]
+    assert sorted(snapshot['pocos']) == [40]
+
+
+def test_load_ticker_only_corps():
+    _, snapshot = saved_seat_data()
+    # snapshots written before several instances were supported store the ticker only
+    snapshot['corps'] = {corpid: ticker for corpid, (ticker, _) in snapshot['corps'].items()}
+    loaded = SeatData()
+    loaded.load(snapshot)
+    assert str(loaded.get_starbase_by_id(10).corp) == 'MAIN'
+    assert loaded.get_starbase_by_id(20).corp.source == ''
+    assert len(loaded.starbases) == 3 and len(loaded.pocos) == 2
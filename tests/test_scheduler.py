@@ -0,0 +1,54 @@
+from models.scheduler import RefreshScheduler
+
+NOW = 1700000000
+
+
+def scheduler(**kwargs):
+    kwargs.setdefault('stagger', 0)
+    return RefreshScheduler(**kwargs)
+
+
+def test_unknown_corps_are_due():
+    assert scheduler().is_due('starbases', 1, NOW)
+
+
+def test_due_an_interval_after_the_last_update():
+    refresh = scheduler(interval=3600, min_interval=600)
+    assert refresh.schedule('starbases', 1, NOW, updated=NOW - 1000) == NOW + 2600
+    assert not refresh.is_due('starbases', 1, NOW + 2599)
+    assert refresh.is_due('starbases', 1, NOW + 2600)
+
+
+def test_overdue_corps_wait_min_interval():
+    refresh = scheduler(interval=3600, min_interval=600)
+    assert refresh.schedule('starbases', 1, NOW, updated=NOW - 5000) == NOW + 600
+
+
+def test_without_update_time_due_an_interval_after_the_fetch():
+    refresh = scheduler(interval=3600)
+    assert refresh.schedule('pocos', 1, NOW) == NOW + 3600
+    # kinds are scheduled separately
+    assert refresh.is_due('starbases', 1, NOW)
+
+
+def test_stale_corps_back_off_up_to_the_maximum():
+    refresh = scheduler(interval=3600, max_backoff=6 * 3600)
+    delays = [refresh.schedule('starbases', 1, NOW, stale=True) - NOW for _ in range(5)]
+    assert delays == [3600, 7200, 14400, 21600, 21600]
+
+
+def test_fresh_data_ends_the_backoff():
+    refresh = scheduler(interval=3600, min_interval=600)
+    refresh.schedule('starbases', 1, NOW, stale=True)
+    refresh.schedule('starbases', 1, NOW, stale=True)
+    refresh.schedule('starbases', 1, NOW, updated=NOW)
+    assert refresh.schedule('starbases', 1, NOW, stale=True) == NOW + 3600
+
+
+def test_stagger_spreads_consecutive_corps():
+    refresh = RefreshScheduler(interval=3600, stagger=300)
+    offsets = [refresh.schedule('starbases', corpid, NOW, updated=NOW) - NOW - 3600 for corpid in range(1000, 1100)]
+    assert all(0 <= offset < 300 for offset in offsets)
+    assert len(set(offsets)) > 50
+    # the offset of a corp does not change between fetches
+    assert refresh.schedule('starbases', 1000, NOW, updated=NOW) - NOW - 3600 == offsets[0]
@@ -0,0 +1,98 @@
+import pytest
+from models.seatdata import SeatData
+from models.starbases import Silo
+
+
+@pytest.fixture
+def seat_data():
+    seat_data = SeatData('token', 'http://seat.invalid/api/v1')
+    corp = seat_data.intern_corp({'corporationID': 1, 'ticker': 'CORP'})
+    seat_data._ingest_pocos(corp, [{'itemID': hour, 'planetName': 'Planet %s' % hour, 'planetTypeName': 'Temperate',
+                                    'solarSystemName': 'Jita', 'reinforceHour': hour} for hour in range(24)])
+    return seat_data
+
+
+def hours(pocos):
+    return [int(poco.reinforceHour) for poco in pocos]
+
+
+def test_reinforce_window(seat_data):
+    assert hours(seat_data.find_pocos_by_reinforce_window(10, 13)) == [10, 11, 12, 13]
+
+
+def test_reinforce_window_of_a_single_hour(seat_data):
+    assert hours(seat_data.find_pocos_by_reinforce_window(0, 0)) == [0]
+
+
+def test_reinforce_window_wraps_past_midnight(seat_data):
+    assert hours(seat_data.find_pocos_by_reinforce_window(22, 2)) == [22, 23, 0, 1, 2]
+    assert hours(seat_data.find_pocos_by_reinforce_window(23, 0)) == [23, 0]
+
+
+def test_reinforce_window_of_the_whole_day(seat_data):
+    assert hours(seat_data.find_pocos_by_reinforce_window(5, 4)) == list(range(5, 24)) + list(range(5))
+
+
+def test_pocos_no_longer_returned_are_deleted(seat_data):
+    corp = seat_data.intern_corp({'corporationID': 1, 'ticker': 'CORP'})
+    other = seat_data.intern_corp({'corporationID': 2, 'ticker': 'OTHER'})
+    seat_data._ingest_pocos(other, [{'itemID': 100, 'planetName': 'Planet', 'planetTypeName': 'Gas',
+                                     'solarSystemName': 'Jita', 'reinforceHour': 12}])
+    seat_data._ingest_pocos(corp, [{'itemID': 12, 'planetName': 'Planet 12', 'planetTypeName': 'Temperate',
+                                    'solarSystemName': 'Jita', 'reinforceHour': 12}])
+    assert sorted(seat_data.pocos) == [12, 100]
+    assert sorted(poco.id for poco in seat_data.find_pocos_by_system('jita')) == [12, 100]
+    assert [poco.id for poco in seat_data.find_pocos_by_corp(1)] == [12]
+    assert sorted(poco.id for poco in seat_data.find_pocos_by_reinforce_window(0, 23)) == [12, 100]
+    assert seat_data.dirty_pocos >= set(range(24))
+
+
+def test_close_flushes_and_stops_saving():
+    storage = {}
+    seat_data = SeatData(storage=storage, save_delay=60)
+    corp = seat_data.intern_corp({'corporationID': 1, 'ticker': 'CORP'})
+    seat_data._ingest_pocos(corp, [{'itemID': 1, 'planetName': 'Planet', 'planetTypeName': 'Gas',
+                                    'solarSystemName': 'Jita', 'reinforceHour': 12}])
+    timer = seat_data._save_timer
+    assert timer is not None and storage == {}
+    seat_data.close()
+    assert not timer.is_alive() or timer.finished.is_set()
+    assert list(storage[SeatData.STORAGE_KEY]['pocos']) == [1]
+    # a refresh still running after close does not schedule or write saves
+    storage.clear()
+    seat_data._ingest_pocos(corp, [])
+    assert seat_data._save_timer is None
+    seat_data.save()
+    seat_data._debounced_save()
+    assert storage == {}
+
+
+def test_pos_contents_are_refetched_conditionally():
+    fake_seat = pytest.importorskip('benchmarks.fake_seat')
+    fleet = fake_seat.Fleet(corps=2, towers=20, pocos=0)
+    server = fake_seat.FakeSeatServer(fleet).start()
+    try:
+        seat_data = SeatData('token', server.url, contents_ttl=0)
+        seat_data.fetch_starbases()
+        session = seat_data.sources['']
+
+        def quantities():
+            return {module.itemID: module.quantity for starbase in seat_data.get_all_starbases()
+                    for module in seat_data.get_pos_modules(starbase) if type(module) is Silo}
+
+        seat_data.refresh_pos_contents()
+        assert quantities() == fleet.silos
+        siloid = next(iter(fleet.silos))
+        fleet.silos[siloid] += 7
+        seat_data.refresh_pos_contents()
+        assert quantities() == fleet.silos
+        assert seat_data.stats.endpoints['silo_contents'].not_modified == len(fleet.silos) - 1
+
+        starbase = seat_data.get_all_starbases()[0]
+        paths = [seat_data._pos_contents_path(starbase.corp, starbase.id)] + [
+            seat_data._silo_contents_path(starbase.corp, module.itemID)
+            for module in seat_data.get_pos_modules(starbase) if type(module) is Silo]
+        seat_data.delete_starbase(starbase.id)
+        assert not any(server.url + path in session.cache for path in paths)
+    finally:
+        server.shutdown()
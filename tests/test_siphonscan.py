@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+from models.siphonscan import SiphonScan
+
+
+class FakeSeatData:
+    """Towers whose contents are all expired, refetching them returns the towers in fetched"""
+
+    def __init__(self, count, fetched, anomalies=()):
+        self.starbases = [SimpleNamespace(id=id, moon='Moon %s' % id, type='Tower',
+                                         corp=SimpleNamespace(corporationID=1))
+                          for id in range(count)]
+        self.fetched = fetched
+        self.anomalies = anomalies
+        self.contents = SimpleNamespace(is_expired=lambda corpid, starbaseid: True)
+
+    def get_all_starbases(self):
+        return self.starbases
+
+    def find_siphon_anomalies(self):
+        return [(self.starbases[id], None, None, None) for id in self.anomalies]
+
+    def refresh_pos_contents(self, starbases, on_tower):
+        for starbase in starbases:
+            if starbase.id in self.fetched:
+                on_tower(starbase)
+
+    def get_pos_modules(self, starbase):
+        return []
+
+
+def scan(seat_data):
+    messages = []
+    siphon_scan = SiphonScan(seat_data, lambda subscriber, text: messages.append(text), lambda starbase: None)
+    siphon_scan.attach('user')
+    siphon_scan._run()
+    return messages
+
+
+def test_clean_scan():
+    assert scan(FakeSeatData(10, fetched=range(10)))[-1] == "Did not find any siphons."
+
+
+def test_siphons_found():
+    assert scan(FakeSeatData(10, fetched=range(10), anomalies=[3]))[-1] == \
+        "Siphon scan done, 1 possible siphons in 10 towers."
+
+
+def test_unfetched_towers_are_not_reported_clean():
+    assert scan(FakeSeatData(10, fetched=range(4)))[-1] == \
+        "Siphon scan incomplete, the contents of 6/10 towers could not be fetched, 0 possible siphons found in the " \
+        "others."
+
+
+def test_failed_scan():
+    seat_data = FakeSeatData(10, fetched=range(10))
+    seat_data.find_siphon_anomalies = None
+    assert scan(seat_data)[-1] == "Siphon scan failed after 0/10 towers, 0 possible siphons found so far."